@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -34,6 +36,13 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
 )
 
 pytest_plugins = [
+    'core.pytest_plugin',
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def inline_thumbnails(monkeypatch):
+    """Миниатюры готовятся в потоке запроса: пул не переживает тест."""
+    monkeypatch.setattr('posts.thumbnails.THUMBNAIL_WORKERS', 0)
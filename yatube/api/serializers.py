@@ -0,0 +1,102 @@
+from posts.feeds import FEED_ORDERING
+from posts.models import Post
+from posts.search import RANK
+
+IMAGE_STORAGE = Post._meta.get_field("image").storage
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def image_url(name):
+    return IMAGE_STORAGE.url(name) if name else None
+
+
+class Fieldset:
+    """
+    Поля ресурса: имя в API -> путь для ``values()``. Строки читаются
+    словарями, без создания моделей, а ``?fields=`` оставляет в ответе
+    только перечисленные поля. Поля ``key`` выбираются всегда: по ним
+    строится курсор страницы.
+    """
+
+    def __init__(self, fields, key=("id",), convert=None):
+        self.fields = fields
+        self.key = key
+        self.convert = convert or {}
+
+    def names(self, request):
+        """Имена полей из ``?fields=``, по умолчанию — все."""
+        raw = request.GET.get("fields", "")
+        names = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidFields(unknown)
+        return names or list(self.fields)
+
+    def values(self, queryset, names):
+        lookups = dict.fromkeys(
+            [*self.key, *(self.fields[name] for name in names)])
+        return queryset.values(*lookups)
+
+    def row(self, values, names):
+        row = {}
+        for name in names:
+            value = values[self.fields[name]]
+            convert = self.convert.get(name)
+            row[name] = value if convert is None else convert(value)
+        return row
+
+
+POST = Fieldset(
+    {
+        "id": "id",
+        "text": "text",
+        "pub_date": "pub_date",
+        "author": "author__username",
+        "group": "group__slug",
+        "image": "image",
+        "comment_count": "comment_count",
+    },
+    key=("pub_date", "id"),
+    convert={"image": image_url},
+)
+COMMENT = Fieldset(
+    {
+        "id": "id",
+        "post": "post_id",
+        "author": "author__username",
+        "text": "text",
+        "created": "created",
+    },
+    key=("created", "id"),
+)
+GROUP = Fieldset(
+    {
+        "id": "id",
+        "slug": "slug",
+        "title": "title",
+        "description": "description",
+    },
+    key=("title", "id"),
+)
+PROFILE = Fieldset(
+    {
+        "username": "username",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "posts_count": "stats__posts_count",
+        "comments_count": "stats__comments_count",
+        "followers_count": "stats__followers_count",
+        "following_count": "stats__following_count",
+    },
+    key=("id",),
+)
+# Лента подписок сливается из нескольких запросов по общему ключу.
+FOLLOW_POST = Fieldset(
+    POST.fields, key=tuple(name.lstrip("-") for name in FEED_ORDERING),
+    convert=POST.convert)
+# Результаты поиска сортируются по рангу, он и входит в курсор.
+SEARCH_RESULT = Fieldset(
+    POST.fields, key=(RANK, "id"), convert=POST.convert)
@@ -0,0 +1,4 @@
+# Постов и комментариев на странице API; клиент может попросить меньше
+# или больше параметром ?limit=, но не больше API_MAX_PAGE_SIZE.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
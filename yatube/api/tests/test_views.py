@@ -0,0 +1,237 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = "author"
+FOLLOWER = "follower"
+GROUP_SLUG = "group"
+OTHER_SLUG = "other"
+POST_TEXT = "Первый пост про котиков"
+NEW_TEXT = "Новый пост"
+COMMENT_TEXT = "Комментарий"
+JSON = "application/json"
+
+POSTS = reverse("api:v1:posts")
+GROUPS = reverse("api:v1:groups")
+GROUP_POSTS = reverse("api:v1:group_posts", args=[GROUP_SLUG])
+PROFILE = reverse("api:v1:profile", args=[USERNAME])
+PROFILE_POSTS = reverse("api:v1:profile_posts", args=[USERNAME])
+FOLLOW = reverse("api:v1:follow", args=[USERNAME])
+FOLLOW_SELF = reverse("api:v1:follow", args=[FOLLOWER])
+FOLLOW_INDEX = reverse("api:v1:follow_index")
+SEARCH = reverse("api:v1:search")
+MISSING_POST = reverse("api:v1:post_detail", args=[10 ** 6])
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.group = Group.objects.create(
+            title="Группа", slug=GROUP_SLUG, description="Описание")
+        cls.other_group = Group.objects.create(
+            title="Другая группа", slug=OTHER_SLUG, description="Описание")
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {number}")
+            for number in range(2)
+        ]
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text=POST_TEXT)
+        cls.DETAIL = reverse("api:v1:post_detail", args=[cls.post.pk])
+        cls.COMMENTS = reverse("api:v1:comments", args=[cls.post.pk])
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.follower_client = Client()
+        cls.follower_client.force_login(cls.follower)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.guest = Client()
+
+    def test_posts_feed(self):
+        """Лента постов отдаёт поля поста, новые посты первыми."""
+        data = self.guest.get(POSTS).json()
+        self.assertEqual(len(data["results"]), 3)
+        first = data["results"][0]
+        self.assertEqual(first["id"], self.post.pk)
+        self.assertEqual(first["text"], POST_TEXT)
+        self.assertEqual(first["author"], USERNAME)
+        self.assertEqual(first["group"], GROUP_SLUG)
+        self.assertIsNone(first["image"])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_sparse_fieldsets(self):
+        """?fields= ограничивает поля, неизвестное поле — 400."""
+        data = self.guest.get(POSTS, {"fields": "id,text"}).json()
+        self.assertEqual(set(data["results"][0]), {"id", "text"})
+        response = self.guest.get(POSTS, {"fields": "id,password"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json()["detail"])
+
+    def test_cursor_pagination(self):
+        """Курсоры листают ленту вперёд без повторов и пропусков."""
+        first = self.guest.get(POSTS, {"limit": 2}).json()
+        self.assertEqual(len(first["results"]), 2)
+        self.assertIsNone(first["previous_cursor"])
+        second = self.guest.get(
+            POSTS, {"limit": 2, "cursor": first["next_cursor"]}).json()
+        self.assertEqual(
+            [row["id"] for row in first["results"] + second["results"]],
+            [self.post.pk, self.posts[1].pk, self.posts[0].pk])
+        self.assertIsNone(second["next_cursor"])
+        self.assertIsNotNone(second["previous_cursor"])
+
+    def test_etag(self):
+        """Пост отвечает 304 по ETag, пока не появится комментарий."""
+        response = self.guest.get(self.DETAIL)
+        self.assertEqual(response.json()["text"], POST_TEXT)
+        cached = self.guest.get(
+            self.DETAIL, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        Comment.objects.create(
+            post=self.post, author=self.follower, text=COMMENT_TEXT)
+        fresh = self.guest.get(
+            self.DETAIL, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json()["comment_count"], 1)
+
+    def test_comment_changes_feed_etag(self):
+        """Новый комментарий меняет comment_count и ETag лент."""
+        urls = [POSTS, GROUP_POSTS, PROFILE_POSTS]
+        etags = {url: self.guest.get(url)["ETag"] for url in urls}
+        Comment.objects.create(
+            post=self.post, author=self.follower, text=COMMENT_TEXT)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()["results"][0]["comment_count"], 1)
+
+    def test_errors_are_json(self):
+        """Ошибки 404, 405 и 401 приходят в JSON."""
+        response = self.guest.get(MISSING_POST)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("detail", response.json())
+        response = self.guest.delete(POSTS)
+        self.assertEqual(response.status_code, 405)
+        self.assertIn("POST", response["Allow"])
+        self.assertEqual(
+            self.guest.post(POSTS, {"text": NEW_TEXT}).status_code, 401)
+        self.assertEqual(self.guest.get(FOLLOW_INDEX).status_code, 401)
+
+    def test_create_post(self):
+        """Автор создаёт пост в группе по slug."""
+        response = self.author_client.post(
+            POSTS, json.dumps({"text": NEW_TEXT, "group": OTHER_SLUG}),
+            content_type=JSON)
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data["author"], USERNAME)
+        self.assertEqual(data["group"], OTHER_SLUG)
+        post = Post.objects.get(pk=data["id"])
+        self.assertEqual(post.text, NEW_TEXT)
+        self.assertEqual(post.group, self.other_group)
+
+    def test_create_post_validation(self):
+        """Пост без текста или не объект JSON — 400."""
+        response = self.author_client.post(
+            POSTS, json.dumps({"group": OTHER_SLUG}), content_type=JSON)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("text", response.json()["errors"])
+        response = self.author_client.post(
+            POSTS, "[]", content_type=JSON)
+        self.assertEqual(response.status_code, 400)
+
+    def test_edit_post(self):
+        """PATCH меняет только переданные поля."""
+        response = self.author_client.patch(
+            self.DETAIL, json.dumps({"text": NEW_TEXT}), content_type=JSON)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["group"], GROUP_SLUG)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, NEW_TEXT)
+        self.assertEqual(self.post.group, self.group)
+
+    def test_edit_post_requires_json(self):
+        """PATCH не в JSON отклоняется с 415."""
+        response = self.author_client.patch(
+            self.DETAIL, "text=" + NEW_TEXT,
+            content_type="application/x-www-form-urlencoded")
+        self.assertEqual(response.status_code, 415)
+        self.assertIn("detail", response.json())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, POST_TEXT)
+
+    def test_only_author_edits_post(self):
+        """Чужой пост править нельзя."""
+        response = self.follower_client.patch(
+            self.DETAIL, json.dumps({"text": NEW_TEXT}), content_type=JSON)
+        self.assertEqual(response.status_code, 403)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, POST_TEXT)
+
+    def test_comments(self):
+        """Комментарий создаётся и выводится в выбранном порядке."""
+        response = self.follower_client.post(
+            self.COMMENTS, json.dumps({"text": COMMENT_TEXT}),
+            content_type=JSON)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["author"], FOLLOWER)
+        data = self.guest.get(self.COMMENTS, {"order": "newest"}).json()
+        self.assertEqual(data["order"], "newest")
+        self.assertEqual(
+            [(row["text"], row["post"]) for row in data["results"]],
+            [(COMMENT_TEXT, self.post.pk)])
+
+    def test_groups(self):
+        """Список групп и посты группы; неизвестная группа — 404."""
+        data = self.guest.get(GROUPS, {"fields": "slug"}).json()
+        self.assertEqual(
+            data["results"], [{"slug": GROUP_SLUG}, {"slug": OTHER_SLUG}])
+        data = self.guest.get(GROUP_POSTS).json()
+        self.assertEqual(len(data["results"]), 3)
+        missing = reverse("api:v1:group_posts", args=["missing"])
+        self.assertEqual(self.guest.get(missing).status_code, 404)
+
+    def test_profile(self):
+        """Профиль отдаёт счётчики, подписку и посты автора."""
+        data = self.guest.get(PROFILE).json()
+        self.assertEqual(data["username"], USERNAME)
+        self.assertEqual(data["posts_count"], 3)
+        self.assertFalse(data["following"])
+        data = self.guest.get(PROFILE_POSTS, {"fields": "author"}).json()
+        self.assertEqual(
+            data["results"], [{"author": USERNAME}] * 3)
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка повторяемы, на себя — 400."""
+        response = self.follower_client.post(FOLLOW)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.follower_client.post(FOLLOW).status_code, 200)
+        self.assertTrue(self.follower_client.get(PROFILE).json()["following"])
+        feed = self.follower_client.get(FOLLOW_INDEX).json()
+        self.assertEqual(len(feed["results"]), 3)
+        self.assertEqual(self.follower_client.delete(FOLLOW).status_code, 204)
+        self.assertFalse(Follow.objects.filter(user=self.follower).exists())
+        self.assertEqual(self.follower_client.delete(FOLLOW).status_code, 404)
+        self.assertEqual(
+            self.follower_client.post(FOLLOW_SELF).status_code, 400)
+
+    def test_search(self):
+        """Поиск находит посты, пустой запрос ничего не отдаёт."""
+        data = self.guest.get(SEARCH, {"q": "котик"}).json()
+        self.assertEqual(
+            [row["id"] for row in data["results"]], [self.post.pk])
+        self.assertEqual(
+            self.guest.get(SEARCH).json()["results"], [])
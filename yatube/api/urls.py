@@ -0,0 +1,38 @@
+from django.urls import include, path
+
+from . import views
+
+app_name = "api"
+
+v1 = [
+    path("posts/", views.posts, name="posts"),
+    path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.comments,
+        name="comments"
+    ),
+    path("groups/", views.groups, name="groups"),
+    path(
+        "groups/<slug:slug>/posts/",
+        views.group_posts,
+        name="group_posts"
+    ),
+    path("profiles/<str:username>/", views.profile, name="profile"),
+    path(
+        "profiles/<str:username>/posts/",
+        views.profile_posts,
+        name="profile_posts"
+    ),
+    path(
+        "profiles/<str:username>/follow/",
+        views.follow,
+        name="follow"
+    ),
+    path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search_posts, name="search"),
+]
+
+urlpatterns = [
+    path("v1/", include((v1, "v1"))),
+]
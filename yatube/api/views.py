@@ -0,0 +1,297 @@
+import json
+from functools import wraps
+
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from posts import caching, search
+from posts.feeds import follow_feed, follow_paginator
+from posts.forms import CommentForm
+from posts.models import FOLLOW_TO_YOURSELF_ERROR, Follow, Group, Post, User
+from posts.paginator import CursorPaginator
+from posts.settings import COMMENT_ORDERINGS, SEARCH_MAX_QUERY_LENGTH
+from posts.uploads import image_uploads
+from posts.views import (
+    group_scopes, index_scopes, post_scopes, profile_scopes
+)
+
+from . import serializers
+from .forms import ApiPostForm
+from .serializers import InvalidFields
+from .settings import API_MAX_PAGE_SIZE, API_PAGE_SIZE
+
+SAFE_METHODS = ("GET", "HEAD")
+NOT_FOUND = "Не найдено."
+LOGIN_REQUIRED = "Нужно войти."
+FORBIDDEN = "Можно менять только свои посты."
+METHOD_NOT_ALLOWED = "Метод {} не поддерживается."
+INVALID_BODY = "Тело запроса должно быть объектом JSON."
+JSON_ONLY = "Метод {} принимает только application/json."
+INVALID_DATA = "Данные не прошли проверку."
+UNKNOWN_FIELDS = "Неизвестные поля: {}."
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def error(status, detail, **extra):
+    return JsonResponse({"detail": detail, **extra}, status=status)
+
+
+def endpoint(*methods, login=False):
+    """
+    Вид API: принимает только ``methods`` (с GET — и HEAD) и отвечает
+    на ошибки JSON-ом. Запись и виды с ``login=True`` требуют входа.
+    """
+    allowed = set(methods) | ({"HEAD"} if "GET" in methods else set())
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = error(
+                    405, METHOD_NOT_ALLOWED.format(request.method))
+                response["Allow"] = ", ".join(sorted(allowed))
+                return response
+            if ((login or request.method not in SAFE_METHODS)
+                    and not request.user.is_authenticated):
+                return error(401, LOGIN_REQUIRED)
+            try:
+                return view(request, *args, **kwargs)
+            except Http404:
+                return error(404, NOT_FOUND)
+            except InvalidFields as exc:
+                unknown = ", ".join(exc.args[0])
+                return error(400, UNKNOWN_FIELDS.format(unknown))
+            except ApiError as exc:
+                return error(exc.status, exc.detail)
+        return wrapper
+    return decorator
+
+
+def body(request):
+    """
+    Данные записи: JSON-объект из тела или поля обычной формы. Django
+    разбирает формы только у POST, поэтому другие методы принимают
+    только JSON, иначе — 415.
+    """
+    if request.content_type != "application/json":
+        if request.method != "POST":
+            raise ApiError(415, JSON_ONLY.format(request.method))
+        return request.POST
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ApiError(400, INVALID_BODY)
+    if not isinstance(data, dict):
+        raise ApiError(400, INVALID_BODY)
+    return data
+
+
+def invalid(form):
+    return error(400, INVALID_DATA, errors=form.errors.get_json_data())
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get("limit", API_PAGE_SIZE))
+    except ValueError:
+        size = API_PAGE_SIZE
+    return min(max(size, 1), API_MAX_PAGE_SIZE)
+
+
+def page_response(request, paginator, fieldset, names, **extra):
+    """Страница строк ``fieldset`` по курсору из ``?cursor=``."""
+    page = paginator.get_page(cursor=request.GET.get("cursor"))
+    return JsonResponse({
+        **extra,
+        "results": [fieldset.row(values, names) for values in page],
+        "next_cursor": page.paginator.next_cursor,
+        "previous_cursor": page.paginator.previous_cursor,
+    })
+
+
+def paginated(request, queryset, fieldset, ordering=("-pub_date", "-pk"),
+              **extra):
+    names = fieldset.names(request)
+    paginator = CursorPaginator(
+        fieldset.values(queryset, names), page_size(request), ordering)
+    return page_response(request, paginator, fieldset, names, **extra)
+
+
+def detail(request, queryset, fieldset, status=200, **extra):
+    """Одна строка ``fieldset``; 404, если запрос ничего не нашёл."""
+    names = fieldset.names(request)
+    rows = list(fieldset.values(queryset, names)[:1])
+    if not rows:
+        raise Http404
+    return JsonResponse(
+        {**fieldset.row(rows[0], names), **extra}, status=status)
+
+
+def user_id(username):
+    found = User.objects.filter(username=username).values_list(
+        "pk", flat=True).first()
+    if found is None:
+        raise Http404
+    return found
+
+
+def groups_scopes(request):
+    return []
+
+
+@caching.page(index_scopes)
+@image_uploads
+@endpoint("GET", "POST")
+def posts(request):
+    if request.method != "POST":
+        return paginated(request, Post.objects.all(), serializers.POST)
+    form = ApiPostForm(
+        body(request),
+        files=request.FILES or None,
+        upload_errors=request.upload_errors
+    )
+    if not form.is_valid():
+        return invalid(form)
+    post = form.save(commit=False)
+    post.author = request.user
+    post.save()
+    return detail(
+        request, Post.objects.filter(pk=post.pk), serializers.POST, 201)
+
+
+@caching.page(post_scopes)
+@endpoint("GET", "PATCH")
+def post_detail(request, post_id):
+    """
+    Пост; PATCH меняет текст и группу. Картинку через API можно задать
+    только при создании поста (multipart POST на posts/), сменить её
+    нельзя.
+    """
+    if request.method != "PATCH":
+        return detail(
+            request, Post.objects.filter(pk=post_id), serializers.POST)
+    post = get_object_or_404(Post.objects.select_related("group"), pk=post_id)
+    if post.author_id != request.user.pk:
+        return error(403, FORBIDDEN)
+    # PATCH меняет только переданные поля, остальные берутся из поста.
+    data = {"text": post.text, "group": post.group and post.group.slug}
+    data.update(body(request))
+    form = ApiPostForm(data, instance=post)
+    if not form.is_valid():
+        return invalid(form)
+    form.save()
+    return detail(request, Post.objects.filter(pk=post_id), serializers.POST)
+
+
+@caching.page(post_scopes)
+@endpoint("GET", "POST")
+def comments(request, post_id):
+    post = get_object_or_404(
+        Post.objects.only("author", "group"), pk=post_id)
+    if request.method != "POST":
+        order = request.GET.get("order")
+        if order not in COMMENT_ORDERINGS:
+            order = next(iter(COMMENT_ORDERINGS))
+        return paginated(
+            request, post.comments.all(), serializers.COMMENT,
+            COMMENT_ORDERINGS[order], order=order)
+    form = CommentForm(body(request))
+    if not form.is_valid():
+        return invalid(form)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    return detail(
+        request, post.comments.filter(pk=comment.pk), serializers.COMMENT,
+        201)
+
+
+@caching.page(groups_scopes)
+@endpoint("GET")
+def groups(request):
+    return paginated(
+        request, Group.objects.all(), serializers.GROUP, ("title", "pk"))
+
+
+@caching.page(group_scopes)
+@endpoint("GET")
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        "pk", flat=True).first()
+    if group_id is None:
+        raise Http404
+    return paginated(
+        request, Post.objects.filter(group_id=group_id), serializers.POST)
+
+
+@caching.page(profile_scopes)
+@endpoint("GET")
+def profile(request, username):
+    names = serializers.PROFILE.names(request)
+    rows = list(serializers.PROFILE.values(
+        User.objects.filter(username=username), names)[:1])
+    if not rows:
+        raise Http404
+    following = request.user.is_authenticated and (
+        Follow.objects.filter(
+            user=request.user, author_id=rows[0]["id"]).exists()
+    )
+    return JsonResponse({
+        **serializers.PROFILE.row(rows[0], names),
+        "following": following,
+    })
+
+
+@caching.page(profile_scopes)
+@endpoint("GET")
+def profile_posts(request, username):
+    return paginated(
+        request, Post.objects.filter(author_id=user_id(username)),
+        serializers.POST)
+
+
+@endpoint("POST", "DELETE")
+def follow(request, username):
+    """POST подписывает на автора, DELETE отписывает."""
+    if request.method == "DELETE":
+        get_object_or_404(
+            Follow, user=request.user, author__username=username).delete()
+        return HttpResponse(status=204)
+    author = get_object_or_404(User.objects.only("pk"), username=username)
+    if author == request.user:
+        return error(400, FOLLOW_TO_YOURSELF_ERROR)
+    created = Follow.objects.follow(request.user, author)
+    return JsonResponse(
+        {"author": username, "following": True},
+        status=201 if created else 200)
+
+
+@endpoint("GET", login=True)
+def follow_index(request):
+    fieldset = serializers.FOLLOW_POST
+    names = fieldset.names(request)
+    paginator = follow_paginator(
+        [fieldset.values(posts, names)
+         for posts in follow_feed(request.user)],
+        page_size(request))
+    return page_response(request, paginator, fieldset, names)
+
+
+@endpoint("GET")
+def search_posts(request):
+    query = request.GET.get("q", "").strip()[:SEARCH_MAX_QUERY_LENGTH]
+    if not query:
+        return JsonResponse({
+            "query": query, "results": [],
+            "next_cursor": None, "previous_cursor": None,
+        })
+    return paginated(
+        request, search.search(Post.objects.all(), query),
+        serializers.SEARCH_RESULT, search.ORDERING, query=query)
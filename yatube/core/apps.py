@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from . import pool
+
+        # После close_old_connections Django: соединения старше
+        # CONN_MAX_AGE уже закрыты, остальные проверяются.
+        request_started.connect(
+            pool.check_connections, dispatch_uid="core.pool.check")
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from core.pool import PooledConnectionMixin
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+    """PostgreSQL со счётчиками открытых соединений для метрик пула."""
@@ -0,0 +1,24 @@
+from django.db.backends.sqlite3 import base
+
+from core.pool import PooledConnectionMixin
+from core.settings import SQLITE_PRAGMAS
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполнить ``PRAGMA имя = значение`` для каждой пары по порядку."""
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name} = {value}")
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+    """
+    SQLite с настройками соединения из ``PRAGMAS`` в DATABASES (по
+    умолчанию ``SQLITE_PRAGMAS``): WAL, чтобы читатели не ждали
+    писателей, и ожидание блокировки вместо «database is locked».
+    """
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(
+            connection, self.settings_dict.get("PRAGMAS", SQLITE_PRAGMAS))
+        return connection
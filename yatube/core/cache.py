@@ -0,0 +1,238 @@
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .instrumentation import PROCESS_ID
+from .settings import METRICS_CACHE_TIMEOUT, METRICS_FLUSH_INTERVAL
+
+STATS_KEY = "cache-stats:{}:{}"
+STATS_PROCESSES_KEY = "cache-stats:{}:processes"
+OUTCOMES = ("front", "back", "miss")
+# Граница группы: «:», «||» или хеш в конце ключа фрагмента
+# (template.cache.<имя фрагмента>.<md5 переменных>).
+PREFIX = re.compile(r":|\|\||\.[0-9a-f]{32}$")
+
+_missing = object()
+
+
+def key_prefix(key):
+    """Группа ключа для статистики: всё до первой границы из PREFIX."""
+    return PREFIX.split(key, 1)[0]
+
+
+class TwoTierCache(BaseCache):
+    """
+    Двухуровневый кэш: LRU в памяти процесса с коротким сроком жизни
+    перед общим для всех процессов кэшем ``OPTIONS["BACK"]``. Запись
+    идёт в оба уровня. Ключи с префиксами ``SHARED_PREFIXES`` (версии
+    лент) всегда читаются из общего кэша: так смена версии сразу видна
+    всем процессам, а данные под версионированными ключами неизменны и
+    безопасно живут в памяти. ``LOCATION`` — имя кэша в статистике.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.name = location
+        self._back_alias = options["BACK"]
+        self.front_timeout = options.get("FRONT_TIMEOUT", 5)
+        self.front_max_entries = options.get("FRONT_MAX_ENTRIES", 1000)
+        self.shared_prefixes = tuple(options.get("SHARED_PREFIXES", ()))
+        self._front = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._flushed = time.monotonic()
+
+    @property
+    def back(self):
+        return caches[self._back_alias]
+
+    def _shared(self, key):
+        return key.startswith(self.shared_prefixes)
+
+    def _front_get(self, key, version):
+        full_key = self.make_key(key, version)
+        with self._lock:
+            entry = self._front.get(full_key)
+            if entry is None:
+                return _missing
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._front[full_key]
+                return _missing
+            self._front.move_to_end(full_key)
+        return pickle.loads(pickled)
+
+    def _front_set(self, key, value, timeout, version):
+        full_key = self.make_key(key, version)
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            if timeout <= 0:
+                self._front_delete(key, version)
+                return
+            ttl = min(timeout, self.front_timeout)
+        else:
+            ttl = self.front_timeout
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._front[full_key] = (time.monotonic() + ttl, pickled)
+            self._front.move_to_end(full_key)
+            while len(self._front) > self.front_max_entries:
+                self._front.popitem(last=False)
+
+    def _front_delete(self, key, version):
+        with self._lock:
+            self._front.pop(self.make_key(key, version), None)
+
+    def _count(self, key, outcome):
+        with self._lock:
+            counts = self._stats.setdefault(key_prefix(key), [0, 0, 0])
+            counts[OUTCOMES.index(outcome)] += 1
+            due = time.monotonic() - self._flushed >= METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush_stats()
+
+    def get(self, key, default=None, version=None):
+        if not self._shared(key):
+            value = self._front_get(key, version)
+            if value is not _missing:
+                self._count(key, "front")
+                return value
+        value = self.back.get(key, _missing, version=version)
+        if value is _missing:
+            self._count(key, "miss")
+            return default
+        self._count(key, "back")
+        if not self._shared(key):
+            self._front_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, rest = {}, []
+        for key in keys:
+            value = _missing
+            if not self._shared(key):
+                value = self._front_get(key, version)
+            if value is _missing:
+                rest.append(key)
+            else:
+                self._count(key, "front")
+                found[key] = value
+        from_back = self.back.get_many(rest, version=version) if rest else {}
+        for key in rest:
+            if key not in from_back:
+                self._count(key, "miss")
+                continue
+            self._count(key, "back")
+            if not self._shared(key):
+                self._front_set(key, from_back[key], DEFAULT_TIMEOUT, version)
+        found.update(from_back)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.back.set(key, value, timeout, version=version)
+        if not self._shared(key):
+            self._front_set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.back.add(key, value, timeout, version=version)
+        if added and not self._shared(key):
+            self._front_set(key, value, timeout, version)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.back.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if not self._shared(key) and key not in (failed or ()):
+                self._front_set(key, value, timeout, version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._front_delete(key, version)
+        return self.back.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._front_delete(key, version)
+        self.back.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._front_delete(key, version)
+        self.back.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return (
+            not self._shared(key)
+            and self._front_get(key, version) is not _missing
+        ) or self.back.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._front_delete(key, version)
+        return self.back.incr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._front.clear()
+        self.back.clear()
+
+    def clear_front(self):
+        with self._lock:
+            self._front.clear()
+
+    def snapshot(self):
+        """Счётчики процесса: {префикс: [из памяти, из общего, промахи]}."""
+        with self._lock:
+            return {prefix: list(counts)
+                    for prefix, counts in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+    def flush_stats(self):
+        """Сбросить счётчики процесса в общий кэш для страницы статистики."""
+        self._flushed = time.monotonic()
+        self.back.set(
+            STATS_KEY.format(self.name, PROCESS_ID), self.snapshot(),
+            METRICS_CACHE_TIMEOUT)
+        processes_key = STATS_PROCESSES_KEY.format(self.name)
+        processes = self.back.get(processes_key, [])
+        if PROCESS_ID not in processes:
+            self.back.set(
+                processes_key, processes + [PROCESS_ID],
+                METRICS_CACHE_TIMEOUT)
+
+
+def stats():
+    """
+    Попадания и промахи двухуровневых кэшей по префиксам ключей,
+    сложенные по всем процессам: {имя: {префикс: {...}}}.
+    """
+    result = {}
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if not isinstance(cache, TwoTierCache):
+            continue
+        cache.flush_stats()
+        processes = cache.back.get(
+            STATS_PROCESSES_KEY.format(cache.name), [])
+        snapshots = cache.back.get_many(
+            [STATS_KEY.format(cache.name, process) for process in processes])
+        totals = {}
+        for snapshot in snapshots.values():
+            for prefix, counts in snapshot.items():
+                total = totals.setdefault(prefix, [0, 0, 0])
+                totals[prefix] = [a + b for a, b in zip(total, counts)]
+        result[cache.name] = {
+            prefix: {
+                **dict(zip(OUTCOMES, counts)),
+                "hit_ratio": round((counts[0] + counts[1]) / sum(counts), 3),
+            }
+            for prefix, counts in sorted(totals.items())
+        }
+    return result
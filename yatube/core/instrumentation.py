@@ -0,0 +1,198 @@
+import bisect
+import contextvars
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+from .settings import (
+    METRICS_BUCKETS, METRICS_CACHE_TIMEOUT, METRICS_FLUSH_INTERVAL
+)
+
+PROCESSES_KEY = "metrics:processes"
+PROCESS_KEY = "metrics:{}"
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.active = set()
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+@contextmanager
+def collect():
+    """Собирать замеры кода внутри блока в новый RequestMetrics."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timer(attribute):
+    """
+    Прибавить время блока к полю текущих замеров, если они идут.
+    Вложенные блоки с тем же полем (шаблон внутри шаблона) не считаются
+    дважды.
+    """
+    metrics = _current.get()
+    if metrics is None or attribute in metrics.active:
+        yield
+        return
+    metrics.active.add(attribute)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.active.discard(attribute)
+        setattr(
+            metrics, attribute, getattr(metrics, attribute)
+            + (time.perf_counter() - start) * 1000
+        )
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обёртка ``connection.execute_wrapper``: считает запросы и время."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.queries += 1
+    with timer("db_ms"):
+        return execute(sql, params, many, context)
+
+
+def empty_histogram(metric):
+    return {
+        "count": 0,
+        "sum": 0.0,
+        "buckets": [0] * (len(METRICS_BUCKETS[metric]) + 1),
+    }
+
+
+def observe(histogram, metric, value):
+    histogram["count"] += 1
+    histogram["sum"] += value
+    histogram["buckets"][
+        bisect.bisect_left(METRICS_BUCKETS[metric], value)] += 1
+
+
+def merge(target, source):
+    """Сложить снимок ``source`` в ``target`` (оба — {view: {metric: h}})."""
+    for view, metrics in source.items():
+        view_target = target.setdefault(view, {})
+        for metric, histogram in metrics.items():
+            merged = view_target.setdefault(metric, empty_histogram(metric))
+            merged["count"] += histogram["count"]
+            merged["sum"] += histogram["sum"]
+            merged["buckets"] = [
+                a + b for a, b in zip(merged["buckets"], histogram["buckets"])
+            ]
+    return target
+
+
+def quantile(histogram, metric, q):
+    """
+    Оценка квантиля по гистограмме: верхняя граница нужной корзины,
+    для последней корзины — строка вида ">5000".
+    """
+    if not histogram["count"]:
+        return None
+    bounds = METRICS_BUCKETS[metric]
+    rank = q * histogram["count"]
+    seen = 0
+    for index, count in enumerate(histogram["buckets"]):
+        seen += count
+        if seen >= rank:
+            break
+    return bounds[index] if index < len(bounds) else f">{bounds[-1]}"
+
+
+class Registry:
+    """
+    Гистограммы замеров процесса по именам URL. Снимок периодически
+    пишется в кэш, откуда его собирают эндпоинт и команда dump_metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._flushed = time.monotonic()
+
+    def record(self, view, **values):
+        with self._lock:
+            metrics = self._views.setdefault(view, {})
+            for metric, value in values.items():
+                observe(
+                    metrics.setdefault(metric, empty_histogram(metric)),
+                    metric, value
+                )
+            due = time.monotonic() - self._flushed >= METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return merge({}, self._views)
+
+    def flush(self):
+        self._flushed = time.monotonic()
+        cache.set(
+            PROCESS_KEY.format(PROCESS_ID), self.snapshot(),
+            METRICS_CACHE_TIMEOUT
+        )
+        processes = cache.get(PROCESSES_KEY, [])
+        if PROCESS_ID not in processes:
+            cache.set(
+                PROCESSES_KEY, processes + [PROCESS_ID], METRICS_CACHE_TIMEOUT)
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+
+registry = Registry()
+
+
+def aggregated():
+    """Гистограммы всех процессов, успевших сбросить снимок в кэш."""
+    registry.flush()
+    processes = cache.get(PROCESSES_KEY, [])
+    snapshots = cache.get_many(
+        [PROCESS_KEY.format(process) for process in processes])
+    result = {}
+    for snapshot in snapshots.values():
+        merge(result, snapshot)
+    return result
+
+
+def summary(histograms):
+    """Сводка по каждому view: число запросов, средние и квантили."""
+    rows = {}
+    for view, metrics in sorted(histograms.items()):
+        total = metrics["total_ms"]
+        row = {"requests": total["count"]}
+        for metric, histogram in metrics.items():
+            if histogram["count"]:
+                row[f"{metric}_avg"] = round(
+                    histogram["sum"] / histogram["count"], 2)
+        row["total_ms_p50"] = quantile(total, "total_ms", 0.5)
+        row["total_ms_p95"] = quantile(total, "total_ms", 0.95)
+        rows[view] = row
+    return rows
@@ -0,0 +1,147 @@
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.backends.sqlite3.base import apply_pragmas
+from core.settings import SQLITE_PRAGMAS
+
+# Настройки SQLite по умолчанию, с которыми работал проект раньше.
+PROFILES = {
+    "default": {},
+    "tuned": SQLITE_PRAGMAS,
+}
+# Python ждёт блокировку 5 секунд, как Django по умолчанию.
+CONNECT_TIMEOUT = 5
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Workload:
+    """Писатели и читатели одной временной базы до истечения срока."""
+
+    def __init__(self, path, pragmas, seconds):
+        self.path = path
+        self.pragmas = pragmas
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+        self.lock = threading.Lock()
+        self.writes = self.reads = self.locked = 0
+        self.latency = []
+
+    def connect(self):
+        connection = sqlite3.connect(
+            self.path, timeout=CONNECT_TIMEOUT, isolation_level=None)
+        apply_pragmas(connection, self.pragmas)
+        return connection
+
+    def write(self):
+        connection = self.connect()
+        while time.monotonic() < self.deadline:
+            started = time.perf_counter()
+            try:
+                connection.execute("BEGIN")
+                connection.execute(
+                    "INSERT INTO post (text, pub_date) VALUES (?, ?)",
+                    ("Текст поста " * 20, time.time()))
+                connection.execute("COMMIT")
+            except sqlite3.OperationalError:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                with self.lock:
+                    self.locked += 1
+                continue
+            with self.lock:
+                self.writes += 1
+                self.latency.append(time.perf_counter() - started)
+        connection.close()
+
+    def read(self):
+        connection = self.connect()
+        while time.monotonic() < self.deadline:
+            try:
+                connection.execute(
+                    "SELECT id, text FROM post "
+                    "ORDER BY pub_date DESC LIMIT 10").fetchall()
+            except sqlite3.OperationalError:
+                with self.lock:
+                    self.locked += 1
+                continue
+            with self.lock:
+                self.reads += 1
+        connection.close()
+
+    def result(self):
+        return {
+            "writes_per_s": round(self.writes / self.seconds),
+            "reads_per_s": round(self.reads / self.seconds),
+            "locked": self.locked,
+            "write_p95_ms": round(
+                percentile(self.latency, 95) * 1000, 2
+            ) if self.latency else None,
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность записи в SQLite с настройками "
+        "по умолчанию и с SQLITE_PRAGMAS при одновременных писателях и "
+        "читателях. Работает с временной базой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument(
+            "--seconds", type=float, default=3,
+            help="Длительность прогона каждого профиля.",
+        )
+
+    def run_profile(self, path, pragmas, writers, readers, seconds):
+        setup = sqlite3.connect(path)
+        apply_pragmas(setup, pragmas)
+        setup.execute(
+            "CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, "
+            "pub_date REAL)")
+        setup.execute("CREATE INDEX post_date ON post (pub_date)")
+        setup.commit()
+        setup.close()
+        workload = Workload(path, pragmas, seconds)
+        threads = [
+            threading.Thread(target=workload.write) for _ in range(writers)]
+        threads += [
+            threading.Thread(target=workload.read) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return workload.result()
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        try:
+            results = {
+                name: self.run_profile(
+                    os.path.join(directory, f"{name}.sqlite3"), pragmas,
+                    options["writers"], options["readers"],
+                    options["seconds"],
+                )
+                for name, pragmas in PROFILES.items()
+            }
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.stdout.write(
+            f"{'profile':<10}{'writes/s':>10}{'reads/s':>10}"
+            f"{'locked':>8}{'p95 ms':>9}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<10}{row['writes_per_s']:>10}{row['reads_per_s']:>10}"
+                f"{row['locked']:>8}{row['write_p95_ms']!s:>9}")
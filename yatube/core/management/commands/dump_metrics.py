@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import instrumentation, pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Печатает сводку замеров запросов по именам URL, собранную "
+        "со всех процессов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--json", action="store_true",
+            help="Вывести гистограммы целиком в JSON.",
+        )
+
+    def handle(self, *args, **options):
+        histograms = instrumentation.aggregated()
+        pools = pool.aggregated()
+        if options["json"]:
+            self.stdout.write(json.dumps(
+                {**histograms, "pools": pools}, indent=2))
+            return
+        self.stdout.write(
+            f"{'view':<26}{'requests':>9}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'db ms':>9}{'tpl ms':>9}{'queries':>9}{'bytes':>10}")
+        for view, row in instrumentation.summary(histograms).items():
+            self.stdout.write(
+                f"{view:<26}{row['requests']:>9}"
+                f"{row['total_ms_p50']:>9}{row['total_ms_p95']:>9}"
+                f"{row.get('db_ms_avg', 0):>9}"
+                f"{row.get('template_ms_avg', 0):>9}"
+                f"{row.get('queries_avg', 0):>9}"
+                f"{row.get('bytes_avg', '-'):>10}")
+        self.stdout.write(
+            f"\n{'database':<26}{'checkouts':>10}{'connects':>9}"
+            f"{'reconn':>9}{'wait ms':>10}{'avg ms':>9}")
+        for alias, row in pool.summary(pools).items():
+            average = row["wait_ms_avg"]
+            self.stdout.write(
+                f"{alias:<26}{row['checkouts']:>10}{row['connects']:>9}"
+                f"{row['reconnects']:>9}{row['wait_ms']:>10}"
+                f"{'-' if average is None else average:>9}")
@@ -0,0 +1,61 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.settings import REPLICA_MAX_LAG
+
+
+def copy(source, target):
+    """Скопировать базу SQLite целиком через backup API."""
+    with closing(sqlite3.connect(source)) as source_db, \
+            closing(sqlite3.connect(target)) as target_db:
+        source_db.backup(target_db)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замена репликации для локальной разработки: копирует основную "
+        "базу SQLite во все DATABASE_REPLICAS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float,
+            help="Повторять копирование с этим интервалом, секунды.",
+        )
+
+    def sync(self):
+        source = connections[DEFAULT_DB_ALIAS].settings_dict
+        for alias in settings.DATABASE_REPLICAS:
+            target = connections[alias].settings_dict
+            copy(source["NAME"], target["NAME"])
+            connections[alias].close()
+        self.stdout.write(
+            f"Реплик обновлено: {len(settings.DATABASE_REPLICAS)}")
+
+    def handle(self, *args, **options):
+        vendors = {
+            connections[alias].vendor
+            for alias in [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]
+        }
+        if vendors != {"sqlite"}:
+            raise CommandError("Копировать можно только базы SQLite.")
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                "Реплик нет: задайте DATABASE_REPLICAS в окружении.")
+        while True:
+            started = time.monotonic()
+            self.sync()
+            if not options["interval"]:
+                return
+            lag = options["interval"] + time.monotonic() - started
+            if lag > REPLICA_MAX_LAG:
+                self.stderr.write(
+                    f"Реплики отстают на {lag:.0f} с, больше "
+                    f"REPLICA_MAX_LAG ({REPLICA_MAX_LAG} с): страницы "
+                    f"из кэша могут показывать старые данные.")
+            time.sleep(options["interval"])
@@ -0,0 +1,77 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from .instrumentation import collect, query_wrapper, registry
+from .routers import replica_reads
+from .settings import REPLICA_PIN_COOKIE, REPLICA_PIN_SECONDS
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class InstrumentationMiddleware:
+    """
+    Считает запросы к БД, время БД и отрисовки шаблонов и размер ответа.
+    Замеры уходят в заголовок Server-Timing и в гистограммы по имени URL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect() as metrics, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_wrapper))
+            response = self.get_response(request)
+        total_ms = metrics.total_ms
+        response["Server-Timing"] = ", ".join((
+            f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries"',
+            f"tpl;dur={metrics.template_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ))
+        match = getattr(request, "resolver_match", None)
+        values = {
+            "total_ms": total_ms,
+            "db_ms": metrics.db_ms,
+            "template_ms": metrics.template_ms,
+            "queries": metrics.queries,
+        }
+        if not response.streaming:
+            values["bytes"] = len(response.content)
+        registry.record(match.view_name if match else "<unresolved>",
+                        **values)
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Разрешает чтение с реплик безопасным запросам. Запрос, который
+    что-то записал, ставит cookie: следующие REPLICA_PIN_SECONDS секунд
+    пользователь читает из основной базы и видит свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def pinned(request):
+        """
+        Была ли запись меньше REPLICA_PIN_SECONDS назад. В cookie — время
+        записи: срок проверяется на сервере, а не только браузером.
+        """
+        try:
+            written = int(request.COOKIES[REPLICA_PIN_COOKIE])
+        except (KeyError, ValueError):
+            return REPLICA_PIN_COOKIE in request.COOKIES
+        return time.time() - written < REPLICA_PIN_SECONDS
+
+    def __call__(self, request):
+        allowed = request.method in SAFE_METHODS and not self.pinned(request)
+        with replica_reads(allowed) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, str(int(time.time())),
+                max_age=REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+        return response
@@ -0,0 +1,130 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .instrumentation import PROCESS_ID, PROCESSES_KEY
+from .settings import METRICS_CACHE_TIMEOUT, METRICS_FLUSH_INTERVAL
+
+POOL_KEY = "metrics:pool:{}"
+COUNTERS = ("checkouts", "connects", "reconnects", "wait_ms")
+
+
+class PoolStats:
+    """
+    Счётчики соединений процесса по алиасам БД: сколько раз запрос
+    получил уже открытое соединение (checkouts), сколько открыто новых
+    (connects), сколько отброшено проверкой (reconnects) и сколько
+    времени ушло на проверку и открытие (wait_ms).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aliases = {}
+        self._flushed = time.monotonic()
+
+    def record(self, alias, **values):
+        with self._lock:
+            counters = self._aliases.setdefault(
+                alias, dict.fromkeys(COUNTERS, 0))
+            for name, value in values.items():
+                counters[name] += value
+            due = time.monotonic() - self._flushed >= METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                alias: dict(counters)
+                for alias, counters in self._aliases.items()
+            }
+
+    def flush(self):
+        self._flushed = time.monotonic()
+        cache.set(
+            POOL_KEY.format(PROCESS_ID), self.snapshot(),
+            METRICS_CACHE_TIMEOUT
+        )
+
+    def reset(self):
+        with self._lock:
+            self._aliases = {}
+
+
+stats = PoolStats()
+
+
+class PooledConnectionMixin:
+    """
+    Примесь к DatabaseWrapper: время открытия нового соединения идёт
+    в счётчики пула.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        stats.record(
+            self.alias, connects=1,
+            wait_ms=(time.perf_counter() - started) * 1000)
+
+
+def check(connection):
+    """
+    Проверить открытое соединение перед запросом. Соединение, которое
+    не отвечает, закрывается: следующий запрос к БД откроет новое.
+    Соединения старше CONN_MAX_AGE до этого уже закрыл Django.
+    """
+    if connection.connection is None:
+        return
+    started = time.perf_counter()
+    usable = (
+        not getattr(settings, "DATABASE_HEALTH_CHECKS", True)
+        or connection.is_usable()
+    )
+    if not usable:
+        connection.close()
+    stats.record(
+        connection.alias,
+        checkouts=int(usable),
+        reconnects=int(not usable),
+        wait_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+def check_connections(**kwargs):
+    """Обработчик request_started: проверить соединения всех алиасов."""
+    for connection in connections.all():
+        check(connection)
+
+
+def aggregated():
+    """Счётчики пулов всех процессов, сложенные по алиасам."""
+    stats.flush()
+    processes = cache.get(PROCESSES_KEY, [])
+    if PROCESS_ID not in processes:
+        processes = processes + [PROCESS_ID]
+    snapshots = cache.get_many(
+        [POOL_KEY.format(process) for process in processes])
+    result = {}
+    for snapshot in snapshots.values():
+        for alias, counters in snapshot.items():
+            total = result.setdefault(alias, dict.fromkeys(COUNTERS, 0))
+            for name, value in counters.items():
+                total[name] += value
+    return result
+
+
+def summary(pools):
+    """Сводка по алиасам: счётчики и среднее ожидание соединения."""
+    rows = {}
+    for alias, counters in sorted(pools.items()):
+        row = dict(counters)
+        row["wait_ms"] = round(row["wait_ms"], 2)
+        acquired = counters["checkouts"] + counters["connects"]
+        row["wait_ms_avg"] = (
+            round(counters["wait_ms"] / acquired, 3) if acquired else None)
+        rows[alias] = row
+    return rows
@@ -0,0 +1,41 @@
+import pytest
+
+from .testing import QueryRecorder
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--no-query-budgets", action="store_true",
+        help="Не проверять бюджеты запросов и N+1 в тестах с БД.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budgets(budgets): свои бюджеты запросов для теста.",
+    )
+
+
+@pytest.fixture
+def query_recorder(request, db):
+    """
+    Запросы к БД по каждому запросу тестового клиента. После теста
+    проверяются бюджеты видов и повторяющиеся запросы (N+1).
+    """
+    marker = request.node.get_closest_marker("query_budgets")
+    recorder = QueryRecorder(marker.args[0] if marker else None)
+    with recorder:
+        yield recorder
+    problems = recorder.violations()
+    if problems:
+        pytest.fail("\n".join(problems), pytrace=False)
+
+
+@pytest.fixture(autouse=True)
+def _query_budgets(request):
+    """Подключает query_recorder ко всем тестам, которые работают с БД."""
+    uses_db = request.node.get_closest_marker("django_db") or any(
+        name in request.fixturenames for name in ("db", "transactional_db"))
+    if uses_db and not request.config.getoption("no_query_budgets"):
+        request.getfixturevalue("query_recorder")
@@ -0,0 +1,80 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_current = contextvars.ContextVar("replica_reads", default=None)
+
+
+class ReplicaReads:
+    """Можно ли читать с реплик в текущем запросе и была ли запись."""
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.wrote = False
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    """
+    Разрешить чтение с реплик внутри блока. Вне таких блоков (команды,
+    фоновые потоки) всё читается из основной базы.
+    """
+    state = ReplicaReads(allowed)
+    token = _current.set(state)
+    try:
+        yield state
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Читать из основной базы внутри блока запроса, где реплики
+    разрешены. Отметка о записи остаётся у запроса.
+    """
+    state = _current.get()
+    if state is None:
+        yield
+        return
+    allowed, state.allowed = state.allowed, False
+    try:
+        yield
+    finally:
+        state.allowed = allowed
+
+
+class ReplicaRouter:
+    """
+    Чтения — на случайную из ``DATABASE_REPLICAS``, записи — в основную
+    базу. После первой записи, в транзакции и вне ``replica_reads``
+    чтения идут в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if (
+            not settings.DATABASE_REPLICAS
+            or state is None
+            or not state.allowed
+            or state.wrote
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает на реплики вместе с данными.
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,68 @@
+# Границы корзин гистограмм замеров запроса (последняя корзина — «больше»).
+METRICS_BUCKETS = {
+    "total_ms": (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    "db_ms": (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+    "template_ms": (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+    "queries": (1, 2, 3, 5, 10, 20, 50, 100, 200),
+    "bytes": (1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+}
+# Как часто процесс сбрасывает свои гистограммы в общий кэш, секунды.
+METRICS_FLUSH_INTERVAL = 10
+METRICS_CACHE_TIMEOUT = 60 * 60 * 24
+# Столько одинаковых по форме запросов за один запрос к сайту — это N+1.
+N_PLUS_ONE_THRESHOLD = 3
+# Наибольшее число запросов к БД на один запрос к виду, включая сессию
+# и пользователя. Запись включает сигналы: счётчики, ленты, версии кэша.
+QUERY_BUDGETS = {
+    "posts:index": 3,
+    "posts:group_list": 5,
+    "posts:profile": 6,
+    "posts:search": 1,
+    "posts:post_detail": 5,
+    "posts:comments": 2,
+    # Третий запрос — авторы без раскладки, их посты читаются отдельно.
+    "posts:follow_index": 4,
+    "posts:post_create": 13,
+    "posts:post_edit": 14,
+    "posts:add_comment": 6,
+    "posts:profile_follow": 10,
+    "posts:profile_unfollow": 8,
+    "api:v1:posts": 11,
+    "api:v1:post_detail": 9,
+    "api:v1:comments": 7,
+    "api:v1:groups": 1,
+    "api:v1:group_posts": 3,
+    "api:v1:profile": 5,
+    "api:v1:profile_posts": 3,
+    "api:v1:follow": 9,
+    "api:v1:follow_index": 4,
+    "api:v1:search": 1,
+}
+# Запросы, которые не входят в бюджет и не считаются N+1: управление
+# транзакциями и точки сохранения — служебные. Запросы к данным сюда не
+# добавляются: повторы нужно собрать в один запрос или учесть в
+# QUERY_BUDGETS.
+IGNORED_QUERIES = (
+    r"^(RELEASE |ROLLBACK TO )?SAVEPOINT ",
+    r"^(BEGIN|COMMIT|ROLLBACK)\b",
+)
+# Настройки каждого нового соединения с SQLite (core.backends.sqlite3).
+# busy_timeout идёт первым: переход в WAL тоже может ждать блокировку.
+SQLITE_PRAGMAS = {
+    "busy_timeout": 5000,
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -20000,
+    "temp_store": "MEMORY",
+}
+# Наибольшее отставание реплик, секунды: интервал sync_replicas плюс
+# время копирования. Страницы, версии которых менялись за это время,
+# собираются по основной базе, иначе в кэш и в ETag новой версии
+# попали бы данные реплики до изменения.
+REPLICA_MAX_LAG = 30
+# После записи чтения пользователя идут в основную базу столько секунд:
+# реплика могла ещё не получить изменения. Меньше REPLICA_MAX_LAG
+# нельзя — сессия, вход и свои посты читались бы со старой реплики.
+REPLICA_PIN_SECONDS = REPLICA_MAX_LAG
+REPLICA_PIN_COOKIE = "read_primary"
@@ -0,0 +1,20 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from .instrumentation import timer
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timer("template_ms"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Движок DTL, который учитывает время отрисовки в замерах запроса."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
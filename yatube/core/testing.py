@@ -0,0 +1,130 @@
+import re
+from collections import Counter
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+
+from .settings import (
+    IGNORED_QUERIES, N_PLUS_ONE_THRESHOLD, QUERY_BUDGETS
+)
+
+LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)"), "(?)"),
+]
+
+
+def query_shape(sql):
+    """SQL без значений: запросы N+1 различаются только параметрами."""
+    for pattern, replacement in LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+class RequestQueries:
+    def __init__(self, path, view_name, start):
+        self.path = path
+        self.view_name = view_name
+        self.start = start
+        self.end = None
+        self.queries = []
+
+    @property
+    def counted(self):
+        """Запросы без служебных, перечисленных в IGNORED_QUERIES."""
+        return [
+            query for query in self.queries if not any(
+                re.search(pattern, query["sql"])
+                for pattern in IGNORED_QUERIES)
+        ]
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Формы запросов, которые повторились не меньше threshold раз."""
+        shapes = Counter(
+            query_shape(query["sql"]) for query in self.counted)
+        return {
+            shape: count for shape, count in shapes.items()
+            if count >= threshold
+        }
+
+
+class QueryRecorder:
+    """
+    Записывает запросы к БД отдельно для каждого запроса к сайту
+    (между сигналами request_started и request_finished) и проверяет
+    их на бюджет вида и на повторяющиеся запросы одной формы.
+    """
+
+    def __init__(self, budgets=None, threshold=N_PLUS_ONE_THRESHOLD,
+                 using="default"):
+        self.budgets = QUERY_BUDGETS if budgets is None else budgets
+        self.threshold = threshold
+        self.capture = CaptureQueriesContext(connections[using])
+        self.requests = []
+
+    def __enter__(self):
+        self.capture.__enter__()
+        request_started.connect(self.started)
+        request_finished.connect(self.finished)
+        return self
+
+    def __exit__(self, *exc_info):
+        request_started.disconnect(self.started)
+        request_finished.disconnect(self.finished)
+        self.capture.__exit__(*exc_info)
+        for request in self.requests:
+            request.queries = self.capture.captured_queries[
+                request.start:request.end]
+
+    def started(self, sender, environ=None, **kwargs):
+        self.finished(sender)
+        path = (environ or {}).get("PATH_INFO", "")
+        try:
+            view_name = resolve(path).view_name
+        except Resolver404:
+            view_name = None
+        self.requests.append(
+            RequestQueries(path, view_name, len(self.capture)))
+
+    def finished(self, sender, **kwargs):
+        if self.requests and self.requests[-1].end is None:
+            self.requests[-1].end = len(self.capture)
+
+    def violations(self):
+        problems = []
+        for request in self.requests:
+            budget = self.budgets.get(request.view_name)
+            count = len(request.counted)
+            if budget is not None and count > budget:
+                problems.append(
+                    f"{request.path} ({request.view_name}): "
+                    f"{count} запросов при бюджете {budget}")
+            for shape, repeats in request.repeated(self.threshold).items():
+                problems.append(
+                    f"{request.path}: N+1, запрос повторён {repeats} раз: "
+                    f"{shape}")
+        return problems
+
+
+class QueryBudgetMixin:
+    """
+    Примесь к TestCase: каждый запрос тестового клиента проверяется
+    на бюджет запросов вида и на N+1.
+    """
+
+    query_budgets = None
+
+    def setUp(self):
+        super().setUp()
+        self.query_recorder = QueryRecorder(self.query_budgets)
+        self.query_recorder.__enter__()
+        self.addCleanup(self.assertQueryBudgets)
+
+    def assertQueryBudgets(self):
+        self.query_recorder.__exit__(None, None, None)
+        problems = self.query_recorder.violations()
+        if problems:
+            self.fail("\n".join(problems))
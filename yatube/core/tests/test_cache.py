@@ -0,0 +1,122 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.cache import TwoTierCache, key_prefix
+from posts.models import Post
+
+User = get_user_model()
+
+STATS_URL = reverse("core:cache_stats")
+INDEX_URL = reverse("posts:index")
+SHARED_KEY = "feed-version:index"
+
+
+def two_tier(**options):
+    return TwoTierCache("test", {"OPTIONS": {
+        "BACK": "shared",
+        "SHARED_PREFIXES": ("feed-version:",),
+        **options,
+    }})
+
+
+class TwoTierCacheTests(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.cache = two_tier(FRONT_TIMEOUT=5, FRONT_MAX_ENTRIES=2)
+
+    def test_reads_go_through_tiers(self):
+        """Промах в памяти процесса читается из общего кэша."""
+        self.cache.set("page:1", "страница")
+        self.assertEqual(self.cache.get("page:1"), "страница")
+        self.cache.clear_front()
+        self.assertEqual(self.cache.get("page:1"), "страница")
+        self.assertIsNone(self.cache.get("page:2"))
+        self.assertEqual(self.cache.snapshot(), {"page": [1, 1, 1]})
+
+    def test_front_expires(self):
+        """Запись в памяти процесса живёт не дольше FRONT_TIMEOUT."""
+        self.cache.set("page:1", "старая")
+        caches["shared"].set("page:1", "новая")
+        self.assertEqual(self.cache.get("page:1"), "старая")
+        with mock.patch("core.cache.time.monotonic", return_value=10 ** 9):
+            self.assertEqual(self.cache.get("page:1"), "новая")
+
+    def test_front_is_lru(self):
+        """При переполнении из памяти уходит давно читанный ключ."""
+        self.cache.set("a", "a")
+        self.cache.set("b", "b")
+        self.cache.get("a")
+        self.cache.set("c", "c")
+        caches["shared"].clear()
+        self.assertEqual(
+            self.cache.get_many(["a", "b", "c"]), {"a": "a", "c": "c"})
+
+    def test_shared_keys_skip_front(self):
+        """Версии, сменённые другим процессом, видны сразу."""
+        self.cache.set(SHARED_KEY, "1")
+        other = two_tier()
+        other.set(SHARED_KEY, "2")
+        self.assertEqual(self.cache.get(SHARED_KEY), "2")
+        self.assertEqual(self.cache.get_many([SHARED_KEY]), {SHARED_KEY: "2"})
+
+    def test_delete_clears_both_tiers(self):
+        """Удаление стирает ключ на обоих уровнях."""
+        self.cache.set("page:1", "страница")
+        self.cache.delete("page:1")
+        self.assertIsNone(self.cache.get("page:1"))
+        self.assertIsNone(caches["shared"].get("page:1"))
+
+    def test_key_prefix(self):
+        """Группа ключа для статистики — всё до «:» или «||»."""
+        self.assertEqual(key_prefix("page:abc"), "page")
+        self.assertEqual(key_prefix("sorl-thumbnail||image||x"),
+                         "sorl-thumbnail")
+        self.assertEqual(key_prefix("template.cache.feed.1"),
+                         "template.cache.feed.1")
+        self.assertEqual(
+            key_prefix("template.cache.index_page." + "0" * 32),
+            "template.cache.index_page")
+
+
+class CacheStatsViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+
+    def test_stats_are_staff_only(self):
+        """Статистику кэша видят только сотрудники."""
+        self.assertEqual(Client().get(STATS_URL).status_code, 302)
+
+    def test_stats_by_prefix(self):
+        """Попадания и промахи считаются по группам ключей."""
+        cache = caches["default"]
+        cache.reset_stats()
+        cache.set("page:1", "страница")
+        cache.get("page:1")
+        cache.get("page:2")
+        client = Client()
+        client.force_login(self.staff)
+        stats = client.get(STATS_URL).json()["default"]["page"]
+        self.assertEqual(stats["front"], 1)
+        self.assertEqual(stats["miss"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_fragment_versions_share_prefix(self):
+        """Версии фрагмента ленты считаются в одной группе."""
+        cache = caches["default"]
+        cache.clear()
+        cache.reset_stats()
+        author = User.objects.create_user(username="author")
+        Client().get(INDEX_URL)
+        Post.objects.create(author=author, text="Новый пост")
+        Client().get(INDEX_URL)
+        fragments = {
+            prefix for prefix in cache.snapshot()
+            if prefix.startswith("template.cache")
+        }
+        self.assertEqual(fragments, {"template.cache.index_page"})
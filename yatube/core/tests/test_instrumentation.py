@@ -0,0 +1,95 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import instrumentation
+from posts.models import Group, Post
+
+User = get_user_model()
+
+INDEX_URL = reverse("posts:index")
+METRICS_URL = reverse("core:metrics")
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание")
+        Post.objects.create(author=cls.user, group=cls.group, text="Пост")
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.registry.reset()
+        self.guest = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_server_timing_header(self):
+        """Ответ содержит время БД, шаблонов и всего запроса."""
+        response = self.guest.get(INDEX_URL)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r"tpl;dur=[\d.]+")
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+
+    def test_histograms_by_url_name(self):
+        """Гистограммы копятся по имени маршрута."""
+        for _ in range(3):
+            self.guest.get(INDEX_URL)
+        metrics = instrumentation.registry.snapshot()["posts:index"]
+        self.assertEqual(metrics["total_ms"]["count"], 3)
+        self.assertGreater(metrics["queries"]["sum"], 0)
+        self.assertGreater(metrics["template_ms"]["sum"], 0)
+        self.assertGreater(metrics["bytes"]["sum"], 0)
+        self.assertEqual(sum(metrics["queries"]["buckets"]), 3)
+
+    def test_endpoint_is_staff_only(self):
+        """Метрики видят только сотрудники."""
+        self.assertEqual(self.guest.get(METRICS_URL).status_code, 302)
+        author = Client()
+        author.force_login(self.user)
+        self.assertEqual(author.get(METRICS_URL).status_code, 302)
+
+    def test_endpoint_merges_processes(self):
+        """Метрики всех процессов складываются."""
+        self.guest.get(INDEX_URL)
+        other = {"posts:index": {
+            metric: instrumentation.empty_histogram(metric)
+            for metric in instrumentation.METRICS_BUCKETS
+        }}
+        instrumentation.observe(other["posts:index"]["total_ms"],
+                                "total_ms", 1)
+        cache.set(instrumentation.PROCESS_KEY.format("other"), other)
+        cache.set(instrumentation.PROCESSES_KEY,
+                  [instrumentation.PROCESS_ID, "other"])
+        data = self.staff_client.get(METRICS_URL).json()
+        self.assertEqual(data["summary"]["posts:index"]["requests"], 2)
+
+    def test_quantile(self):
+        """Квантиль — верхняя граница корзины."""
+        histogram = instrumentation.empty_histogram("queries")
+        for value in (1, 1, 1, 4, 500):
+            instrumentation.observe(histogram, "queries", value)
+        self.assertEqual(instrumentation.quantile(histogram, "queries", .5), 1)
+        self.assertEqual(instrumentation.quantile(histogram, "queries", .8), 5)
+        self.assertEqual(
+            instrumentation.quantile(histogram, "queries", 1), ">200")
+
+    def test_dump_metrics(self):
+        """dump_metrics печатает таблицу и JSON."""
+        self.guest.get(INDEX_URL)
+        out = StringIO()
+        call_command("dump_metrics", stdout=out)
+        self.assertIn("posts:index", out.getvalue())
+        out = StringIO()
+        call_command("dump_metrics", "--json", stdout=out)
+        self.assertIn("posts:index", json.loads(out.getvalue()))
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings, TestCase
+from django.urls import reverse
+
+from core import instrumentation, pool
+from core.backends.sqlite3.base import DatabaseWrapper
+
+User = get_user_model()
+
+INDEX_URL = reverse("posts:index")
+METRICS_URL = reverse("core:metrics")
+ALIAS = "probe"
+
+
+def fake_connection(usable):
+    return SimpleNamespace(
+        alias=ALIAS, connection=object(),
+        is_usable=mock.Mock(return_value=usable), close=mock.Mock())
+
+
+class PoolTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username="staff", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        pool.stats.reset()
+        self.guest = Client()
+
+    def test_request_reuses_open_connection(self):
+        """Запросы берут уже открытое соединение."""
+        self.guest.get(INDEX_URL)
+        self.guest.get(INDEX_URL)
+        counters = pool.stats.snapshot()["default"]
+        self.assertEqual(counters["checkouts"], 2)
+        self.assertEqual(counters["reconnects"], 0)
+
+    def test_closed_connection_is_not_checked(self):
+        """Закрытое соединение не проверяется."""
+        closed = fake_connection(True)
+        closed.connection = None
+        pool.check(closed)
+        closed.is_usable.assert_not_called()
+        self.assertEqual(pool.stats.snapshot(), {})
+
+    def test_unusable_connection_is_closed(self):
+        """Сломанное соединение закрывается."""
+        broken = fake_connection(False)
+        pool.check(broken)
+        broken.close.assert_called_once()
+        counters = pool.stats.snapshot()[ALIAS]
+        self.assertEqual(counters["reconnects"], 1)
+        self.assertEqual(counters["checkouts"], 0)
+
+    @override_settings(DATABASE_HEALTH_CHECKS=False)
+    def test_health_checks_can_be_disabled(self):
+        """Проверку отключает DATABASE_HEALTH_CHECKS."""
+        broken = fake_connection(False)
+        pool.check(broken)
+        broken.is_usable.assert_not_called()
+        broken.close.assert_not_called()
+        self.assertEqual(pool.stats.snapshot()[ALIAS]["checkouts"], 1)
+
+    def test_new_connection_is_counted(self):
+        """Новое соединение учитывается со временем открытия."""
+        wrapper = DatabaseWrapper(dict(connection.settings_dict), ALIAS)
+        wrapper.ensure_connection()
+        wrapper.close()
+        counters = pool.stats.snapshot()[ALIAS]
+        self.assertEqual(counters["connects"], 1)
+        self.assertGreater(counters["wait_ms"], 0)
+
+    def test_endpoint_reports_pools(self):
+        """Метрики соединений всех процессов складываются."""
+        other = {"default": dict.fromkeys(pool.COUNTERS, 1)}
+        cache.set(pool.POOL_KEY.format("other"), other)
+        cache.set(instrumentation.PROCESSES_KEY,
+                  [instrumentation.PROCESS_ID, "other"])
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        staff_client.get(INDEX_URL)
+        pools = staff_client.get(METRICS_URL).json()["pools"]
+        self.assertEqual(pools["default"]["checkouts"], 3)
+        self.assertEqual(pools["default"]["connects"], 1)
+        self.assertIsNotNone(pools["default"]["wait_ms_avg"])
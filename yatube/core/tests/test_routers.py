@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.management.commands.sync_replicas import copy
+from core.middleware import ReplicaMiddleware
+from core.routers import primary_reads, replica_reads
+from core.settings import (
+    REPLICA_MAX_LAG, REPLICA_PIN_COOKIE, REPLICA_PIN_SECONDS
+)
+from posts import caching
+from posts.models import Post
+
+REPLICA = "replica"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(SimpleTestCase):
+    databases = {"default"}
+
+    def test_reads_outside_requests_use_primary(self):
+        """Вне запросов всё читается из основной базы."""
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_reads_go_to_replica_until_write(self):
+        """После записи чтения идут в основную базу."""
+        with replica_reads() as state:
+            self.assertEqual(router.db_for_read(Post), REPLICA)
+            self.assertEqual(router.db_for_write(Post), "default")
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_reads_in_transaction_use_primary(self):
+        """В транзакции чтения идут в основную базу."""
+        with replica_reads(), transaction.atomic():
+            self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_primary_reads_keep_write_mark(self):
+        """primary_reads не теряет отметку о записи."""
+        with replica_reads() as state:
+            with primary_reads():
+                self.assertEqual(router.db_for_read(Post), "default")
+                router.db_for_write(Post)
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_replicas_are_not_migrated(self):
+        """Миграции не применяются к репликам."""
+        self.assertFalse(router.allow_migrate(REPLICA, "posts"))
+        self.assertTrue(router.allow_migrate("default", "posts"))
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.used = []
+
+    def view(self, request):
+        if request.method == "POST":
+            router.db_for_write(Post)
+        self.used.append(router.db_for_read(Post))
+        return HttpResponse()
+
+    def test_write_pins_reads_to_primary(self):
+        """После записи cookie закрепляет чтения за основной базой."""
+        middleware = ReplicaMiddleware(self.view)
+        self.assertNotIn(
+            REPLICA_PIN_COOKIE,
+            middleware(self.factory.get("/")).cookies)
+        response = middleware(self.factory.post("/"))
+        cookie = response.cookies[REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], REPLICA_PIN_SECONDS)
+        request = self.factory.get("/")
+        request.COOKIES[REPLICA_PIN_COOKIE] = cookie.value
+        middleware(request)
+        self.assertEqual(self.used, [REPLICA, "default", "default"])
+
+    def test_pin_covers_replica_lag(self):
+        """Запрет чтения с реплик держится всё отставание реплик."""
+        self.assertGreaterEqual(REPLICA_PIN_SECONDS, REPLICA_MAX_LAG)
+        middleware = ReplicaMiddleware(self.view)
+        with mock.patch("core.middleware.time.time", return_value=1000):
+            cookie = middleware(self.factory.post("/")).cookies[
+                REPLICA_PIN_COOKIE]
+        for delay, expected in ((6, "default"),
+                                (REPLICA_MAX_LAG - 1, "default"),
+                                (REPLICA_MAX_LAG, REPLICA)):
+            with self.subTest(delay=delay):
+                request = self.factory.get("/")
+                request.COOKIES[REPLICA_PIN_COOKIE] = cookie.value
+                with mock.patch("core.middleware.time.time",
+                                return_value=1000 + delay):
+                    middleware(request)
+                self.assertEqual(self.used[-1], expected)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class FreshPageTests(SimpleTestCase):
+    """Страницы с недавно сменённой версией читаются из основной базы."""
+
+    def setUp(self):
+        cache.clear()
+        self.used = []
+        self.page = caching.page(lambda request: [caching.index_scope()])(
+            self.view)
+
+    def view(self, request):
+        self.used.append(router.db_for_read(Post))
+        return HttpResponse()
+
+    def get(self):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        with replica_reads():
+            return self.page(request)
+
+    def settle(self):
+        """Состарить версии так, будто реплики уже догнали основную."""
+        caching.versions(caching.GLOBAL_SCOPE, caching.index_scope())
+        for scope in (caching.GLOBAL_SCOPE, caching.index_scope()):
+            key = caching.VERSION_KEY.format(scope)
+            version = cache.get(key)
+            created = caching.created(version)
+            cache.set(key, version.replace(
+                str(created), str(created - REPLICA_MAX_LAG - 1)), None)
+
+    def test_new_version_reads_primary(self):
+        """Страница свежей версии строится по основной базе."""
+        caching.bump(caching.index_scope())
+        self.get()
+        self.assertEqual(self.used, ["default"])
+
+    def test_settled_version_reads_replica(self):
+        """Через REPLICA_MAX_LAG страница строится по реплике."""
+        caching.bump(caching.index_scope())
+        self.settle()
+        self.get()
+        self.assertEqual(self.used, [REPLICA])
+
+
+class SyncReplicasTests(SimpleTestCase):
+    def test_copy(self):
+        """sync_replicas копирует базу целиком."""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "db.sqlite3")
+            target = os.path.join(directory, "db.replica.sqlite3")
+            with closing(sqlite3.connect(source)) as database:
+                database.execute("CREATE TABLE post (text TEXT)")
+                database.execute("INSERT INTO post VALUES ('Пост')")
+                database.commit()
+            copy(source, target)
+            with closing(sqlite3.connect(target)) as database:
+                rows = database.execute("SELECT text FROM post").fetchall()
+        self.assertEqual(rows, [("Пост",)])
@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.backends.sqlite3.base import apply_pragmas
+from core.settings import SQLITE_PRAGMAS
+
+
+class SqlitePragmasTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        """Новое соединение получает SQLITE_PRAGMAS."""
+        expected = {
+            "busy_timeout": SQLITE_PRAGMAS["busy_timeout"],
+            "synchronous": 1,
+            "temp_store": 2,
+            "cache_size": SQLITE_PRAGMAS["cache_size"],
+        }
+        for name, value in expected.items():
+            with self.subTest(pragma=name):
+                self.assertEqual(self.pragma(name), value)
+
+
+class SqliteFileTests(SimpleTestCase):
+    def test_wal_on_file_database(self):
+        """Файловая база переходит в режим WAL."""
+        with tempfile.TemporaryDirectory() as directory:
+            database = sqlite3.connect(os.path.join(directory, "db.sqlite3"))
+            apply_pragmas(database, SQLITE_PRAGMAS)
+            mode = database.execute("PRAGMA journal_mode").fetchone()[0]
+            database.close()
+        self.assertEqual(mode, "wal")
+
+    def test_benchmark_command(self):
+        """benchmark_sqlite сравнивает настройки."""
+        out = StringIO()
+        call_command(
+            "benchmark_sqlite", "--seconds", "0.2", "--writers", "2",
+            "--readers", "1", stdout=out)
+        self.assertIn("default", out.getvalue())
+        self.assertIn("tuned", out.getvalue())
@@ -0,0 +1,75 @@
+from django.core.signals import request_finished, request_started
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryRecorder, RequestQueries, query_shape
+from posts.models import Post, User
+
+INDEX_URL = reverse("posts:index")
+
+
+class QueryRecorderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f"Пост {i}")
+            for i in range(3)
+        ]
+
+    def test_query_shape(self):
+        """Форма запроса не зависит от значений."""
+        self.assertEqual(
+            query_shape("SELECT 1 FROM t WHERE a = 12 AND b = 'x''y'"),
+            "SELECT ? FROM t WHERE a = ? AND b = ?")
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE id IN (1, 2, 3)"),
+            "SELECT * FROM t WHERE id IN (?)")
+
+    def test_only_transaction_control_ignored(self):
+        """Без учёта остаются только команды транзакций."""
+        request = RequestQueries(INDEX_URL, "posts:index", 0)
+        request.queries = [{"sql": sql} for sql in (
+            "SAVEPOINT \"s1\"",
+            "RELEASE SAVEPOINT \"s1\"",
+            "BEGIN",
+            'SELECT "thumbnail_kvstore"."value" FROM "thumbnail_kvstore"',
+        )]
+        self.assertEqual(
+            [query["sql"] for query in request.counted],
+            ['SELECT "thumbnail_kvstore"."value" FROM "thumbnail_kvstore"'])
+
+    def test_queries_split_by_request(self):
+        """Запросы к БД делятся по запросам к сайту."""
+        with QueryRecorder() as recorder:
+            Client().get(INDEX_URL)
+            User.objects.count()
+            Client().get(INDEX_URL)
+        self.assertEqual(
+            [request.view_name for request in recorder.requests],
+            ["posts:index", "posts:index"])
+        self.assertNotIn(
+            "COUNT", " ".join(
+                query["sql"] for request in recorder.requests
+                for query in request.queries))
+
+    def test_budget_exceeded(self):
+        """Превышение бюджета вида — нарушение."""
+        with QueryRecorder({"posts:index": 0}) as recorder:
+            Client().get(INDEX_URL)
+        self.assertEqual(len(recorder.violations()), 1)
+        self.assertIn("бюджете 0", recorder.violations()[0])
+
+    def test_repeated_queries_detected(self):
+        """Повтор запроса одной формы — N+1."""
+        with QueryRecorder({}) as recorder:
+            request_started.send(
+                sender=None, environ={"PATH_INFO": INDEX_URL})
+            for post in self.posts:
+                Post.objects.get(pk=post.pk)
+            request_finished.send(sender=None)
+        problems = recorder.violations()
+        self.assertEqual(len(problems), 1)
+        self.assertIn("N+1", problems[0])
+        self.assertIn("повторён 3 раз", problems[0])
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = "core"
+
+urlpatterns = [
+    path("metrics/", views.metrics, name="metrics"),
+    path("cache/", views.cache_stats, name="cache_stats"),
+]
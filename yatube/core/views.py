@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import cache, instrumentation, pool
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +19,19 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def metrics(request):
+    histograms = instrumentation.aggregated()
+    return JsonResponse({
+        "summary": instrumentation.summary(histograms),
+        "buckets": instrumentation.METRICS_BUCKETS,
+        "histograms": histograms,
+        "pools": pool.summary(pool.aggregated()),
+    })
+
+
+@staff_member_required
+def cache_stats(request):
+    return JsonResponse(cache.stats())
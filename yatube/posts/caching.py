@@ -0,0 +1,161 @@
+import hashlib
+import time
+import uuid
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from core.routers import primary_reads
+from core.settings import REPLICA_MAX_LAG
+
+from .settings import PAGE_CACHE_TIMEOUT
+
+VERSION_KEY = "feed-version:{}"
+PAGE_KEY = "page:{}"
+# Версия, общая для всех лент: меняется при правке групп и авторов,
+# чьи названия и имена выводятся в карточках постов.
+GLOBAL_SCOPE = "global"
+
+
+def index_scope():
+    return "index"
+
+
+def group_scope(group_id):
+    return f"group:{group_id}"
+
+
+def profile_scope(user_id):
+    return f"profile:{user_id}"
+
+
+def post_scope(post_id):
+    return f"post:{post_id}"
+
+
+def stats_scope(user_id):
+    """Счётчики пользователя: выводятся в профиле и на страницах постов."""
+    return f"stats:{user_id}"
+
+
+def new_version():
+    """Случайная версия с временем её создания."""
+    return f"{uuid.uuid4().hex}-{int(time.time())}"
+
+
+def created(version):
+    """Время создания версии; 0 для версий без времени."""
+    try:
+        return int(version.rpartition("-")[2])
+    except ValueError:
+        return 0
+
+
+def bump(*scopes):
+    """Сменить версии лент: старые фрагменты больше не будут прочитаны."""
+    cache.set_many(
+        {VERSION_KEY.format(scope): new_version() for scope in scopes},
+        timeout=None,
+    )
+
+
+def versions(*scopes):
+    """Текущие версии лент; отсутствующие в кэше создаются заново."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def feed_key(request, scope):
+    """Ключ фрагмента ленты: версии ленты и позиция страницы."""
+    position = request.GET.get("cursor") or request.GET.get("page") or "1"
+    return ".".join(versions(GLOBAL_SCOPE, scope)) + f":{position}"
+
+
+def etag(request, *scopes):
+    """
+    ETag страницы: версии частей, из которых она собрана, адрес с
+    параметрами и пользователь, от которого зависят меню и кнопки.
+    """
+    parts = [
+        *versions(GLOBAL_SCOPE, *scopes),
+        request.get_full_path(),
+        str(request.user.pk),
+    ]
+    return hashlib.md5("\n".join(parts).encode()).hexdigest()
+
+
+def changed_recently(*scopes):
+    """
+    Менялась ли версия частей за последние REPLICA_MAX_LAG секунд:
+    реплики могли ещё не получить изменение.
+    """
+    cutoff = time.time() - REPLICA_MAX_LAG
+    return any(
+        created(version) >= cutoff
+        for version in versions(GLOBAL_SCOPE, *scopes))
+
+
+def _cacheable(request, response):
+    """Ответ без cookie и CSRF-токена, одинаковый для всех гостей."""
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_USED")
+    )
+
+
+def cached_page(request, tag, view, *args, **kwargs):
+    """Ответ вида; гостям без cookie сессии — из кэша по ETag."""
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return view(request, *args, **kwargs)
+    key = PAGE_KEY.format(tag)
+    response = cache.get(key)
+    if response is None:
+        response = view(request, *args, **kwargs)
+        if _cacheable(request, response):
+            cache.set(key, response, PAGE_CACHE_TIMEOUT)
+    return response
+
+
+def page(scopes_func):
+    """
+    Вид страницы, собранной из частей ``scopes_func(request, *args,
+    **kwargs)`` (None — объекта нет, вид отвечает сам). Отвечает 304 по
+    ETag из версий частей, а гостям без cookie сессии отдаёт готовый
+    ответ из кэша. Сигналы меняют версии, и старые ответы не читаются.
+    Пока версия моложе REPLICA_MAX_LAG, страница читается из основной
+    базы: ответ с новым ETag не может отставать от изменения.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            scopes = None
+            if request.method in ("GET", "HEAD"):
+                scopes = scopes_func(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            tag = quote_etag(etag(request, *scopes))
+            response = get_conditional_response(request, etag=tag)
+            if response is None:
+                reads = (
+                    primary_reads() if changed_recently(*scopes)
+                    else nullcontext()
+                )
+                with reads:
+                    response = cached_page(
+                        request, tag, view, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.setdefault("ETag", tag)
+            return response
+        return wrapper
+    return decorator
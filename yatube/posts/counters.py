@@ -0,0 +1,93 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from . import caching
+from .models import Comment, Follow, Post, User, UserStats
+
+USER_COUNTERS = {
+    "posts_count": (Post, "author"),
+    "comments_count": (Comment, "author"),
+    "followers_count": (Follow, "author"),
+    "following_count": (Follow, "user"),
+}
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(count=Count("pk"))
+        .values("count")
+    ), 0)
+
+
+def _bump(queryset, field, delta):
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def bump_user(user_id, field, delta):
+    """Изменить счётчик пользователя; без строки статистики — пересчитать."""
+    caching.bump(caching.stats_scope(user_id))
+    if _bump(UserStats.objects.filter(user_id=user_id), field, delta):
+        return
+    if delta > 0:
+        reconcile_users(User.objects.filter(pk=user_id))
+
+
+def bump_post(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), "comment_count", delta)
+
+
+def reconcile_users(users=None, batch_size=1000):
+    """
+    Пересчитать статистику пользователей пачками по ``batch_size``.
+    Возвращает число исправленных (или созданных) строк.
+    """
+    users = (users if users is not None else User.objects.all()).annotate(
+        **{f"actual_{name}": _count(*source)
+           for name, source in USER_COUNTERS.items()}
+    ).select_related("stats").order_by("pk")
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1].pk
+        created, drifted = [], []
+        for user in batch:
+            actual = {
+                name: getattr(user, f"actual_{name}")
+                for name in USER_COUNTERS
+            }
+            stats = getattr(user, "stats", None)
+            if stats is None:
+                created.append(UserStats(user=user, **actual))
+            elif any(getattr(stats, name) != value
+                     for name, value in actual.items()):
+                for name, value in actual.items():
+                    setattr(stats, name, value)
+                drifted.append(stats)
+        UserStats.objects.bulk_create(created, ignore_conflicts=True)
+        UserStats.objects.bulk_update(drifted, list(USER_COUNTERS))
+        fixed += len(created) + len(drifted)
+
+
+def reconcile_posts(posts=None, batch_size=1000):
+    """Пересчитать ``Post.comment_count`` пачками по ``batch_size``."""
+    posts = (posts if posts is not None else Post.objects.all()).annotate(
+        actual=_count(Comment, "post")
+    ).only("comment_count").order_by("pk")
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1].pk
+        drifted = [post for post in batch if post.comment_count != post.actual]
+        for post in drifted:
+            post.comment_count = post.actual
+        Post.objects.bulk_update(drifted, ["comment_count"])
+        fixed += len(drifted)
@@ -0,0 +1,211 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import FeedEntry, Follow, Post, UserStats
+from .paginator import MergedCursorPaginator
+from .settings import (
+    FANOUT_MAX_FOLLOWERS, FANOUT_RESUME_FOLLOWERS, FEED_BACKFILL_POSTS,
+    FEED_BATCH_SIZE, FEED_WORKERS
+)
+
+# Ключ ленты подписок: дата и id поста — из записи ленты или из поста.
+FEED_ORDERING = ("-feed_date", "-feed_post")
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def followers_count(author):
+    return UserStats.objects.filter(user=author).values_list(
+        "followers_count", flat=True).first() or 0
+
+
+def _fanout_state(author):
+    """Число подписчиков автора и раскладываются ли его посты."""
+    return UserStats.objects.filter(user=author).values_list(
+        "followers_count", "feed_fanout").first() or (0, True)
+
+
+def is_fanout_author(author):
+    """Раскладываются ли посты автора по лентам при публикации."""
+    return _fanout_state(author)[1]
+
+
+def fanout_excluded_authors(user):
+    """id авторов из подписок пользователя, чьи посты читаются на лету."""
+    return Follow.objects.filter(
+        user=user, author__stats__feed_fanout=False,
+    ).values_list("author_id", flat=True)
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _entries(user_ids, posts):
+    """Записи лент для пар «читатель — пост (pk, author_id, pub_date)»."""
+    for user_id in user_ids:
+        for post_id, author_id, pub_date in posts:
+            yield FeedEntry(
+                user_id=user_id, post_id=post_id,
+                author_id=author_id, pub_date=pub_date)
+
+
+def _author_posts(author):
+    """Последние FEED_BACKFILL_POSTS постов автора для копирования в ленты."""
+    posts = Post.objects.filter(author=author).order_by("-pub_date", "-pk")
+    return posts.values_list(
+        "pk", "author_id", "pub_date")[:FEED_BACKFILL_POSTS]
+
+
+def fan_out(post):
+    """Добавить новый пост в ленты всех подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True)
+    _bulk_insert(_entries(
+        followers.iterator(), [(post.pk, post.author_id, post.pub_date)]))
+
+
+def backfill(user, author):
+    """Добавить в ленту пользователя последние посты автора."""
+    if not is_fanout_author(author):
+        return
+    _bulk_insert(_entries([getattr(user, "pk", user)], _author_posts(author)))
+
+
+def fan_out_author(author, posts=None):
+    """Разложить последние посты автора по лентам всех его подписчиков."""
+    posts = list(_author_posts(author) if posts is None else posts)
+    followers = Follow.objects.filter(author=author).values_list(
+        "user_id", flat=True)
+    _bulk_insert(_entries(followers.iterator(), posts))
+    return posts
+
+
+def rebalance(author):
+    """
+    Переключить раскладку автора, если число подписчиков вышло за
+    пороги: выше FANOUT_MAX_FOLLOWERS записи автора убираются из лент,
+    при FANOUT_RESUME_FOLLOWERS и меньше — раскладываются снова.
+    Пока записи раскладываются, посты ещё читаются на лету; посты,
+    опубликованные за это время, докладываются после переключения.
+    """
+    try:
+        count, fanout = _fanout_state(author)
+        stats = UserStats.objects.filter(user=author)
+        if fanout and count > FANOUT_MAX_FOLLOWERS:
+            stats.update(feed_fanout=False)
+            FeedEntry.objects.filter(author=author).delete()
+        elif not fanout and count <= FANOUT_RESUME_FOLLOWERS:
+            posts = fan_out_author(author)
+            stats.update(feed_fanout=True)
+            newer = Post.objects.filter(author=author)
+            if posts:
+                newer = newer.filter(pub_date__gt=posts[0][2])
+            fan_out_author(author, newer.order_by("-pub_date").values_list(
+                "pk", "author_id", "pub_date")[:FEED_BACKFILL_POSTS])
+    except Exception:
+        logger.exception("Не удалось переключить раскладку автора %s", author)
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                FEED_WORKERS, thread_name_prefix="feeds")
+        return _executor
+
+
+def submit(author):
+    if FEED_WORKERS:
+        get_executor().submit(rebalance, author)
+    else:
+        rebalance(author)
+
+
+def schedule_rebalance(author):
+    """
+    Переключить раскладку после фиксации транзакции в пуле потоков:
+    запрос, на котором автор перешёл порог, не ждёт пересборки лент.
+    """
+    transaction.on_commit(lambda: submit(author))
+
+
+def followed(user, author):
+    """
+    Подписка создана (счётчик подписчиков уже увеличен). В ленту
+    копируются последние посты автора, если они раскладываются; автор,
+    перешедший FANOUT_MAX_FOLLOWERS, переключается в фоне.
+    """
+    count, fanout = _fanout_state(author)
+    if not fanout:
+        return
+    _bulk_insert(_entries([getattr(user, "pk", user)], _author_posts(author)))
+    if count > FANOUT_MAX_FOLLOWERS:
+        schedule_rebalance(author)
+
+
+def unfollowed(user, author):
+    """
+    Подписка удалена (счётчик уже уменьшен). Автор, опустившийся до
+    FANOUT_RESUME_FOLLOWERS, снова раскладывается по лентам в фоне.
+    """
+    remove(user, author)
+    count, fanout = _fanout_state(author)
+    if not fanout and count <= FANOUT_RESUME_FOLLOWERS:
+        schedule_rebalance(author)
+
+
+def remove(user, author):
+    """Убрать из ленты пользователя посты автора после отписки."""
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def rebuild(user):
+    """Пересобрать ленту пользователя по текущим подпискам."""
+    FeedEntry.objects.filter(user=user).delete()
+    authors = Follow.objects.filter(user=user).values_list(
+        "author_id", flat=True)
+    for author in authors.iterator():
+        backfill(user, author)
+
+
+def follow_feed(user):
+    """
+    Запросы ленты подписок: материализованные записи по индексу
+    (user, pub_date, post) и по запросу на каждого автора без раскладки
+    по индексу (author, pub_date). У всех один ключ FEED_ORDERING.
+    """
+    querysets = [
+        Post.objects.filter(feed_entries__user=user).annotate(
+            feed_date=F("feed_entries__pub_date"),
+            feed_post=F("feed_entries__post"),
+        )
+    ]
+    for author_id in fanout_excluded_authors(user):
+        querysets.append(Post.objects.filter(author_id=author_id).annotate(
+            feed_date=F("pub_date"), feed_post=F("pk")))
+    return querysets
+
+
+def follow_paginator(querysets, per_page):
+    return MergedCursorPaginator(querysets, per_page, FEED_ORDERING)
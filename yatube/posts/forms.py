@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Post, Comment
 
 
@@ -8,6 +10,19 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("text", "group", "image")
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файлы, которые обработчик загрузки отверг на лету.
+        self.upload_errors = upload_errors or {}
+
+    def clean_image(self):
+        if "image" in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors["image"])
+        image = self.cleaned_data["image"]
+        if isinstance(image, UploadedFile):
+            return uploads.sanitize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,117 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_thumbnails
+
+from .models import Post, StoredImage
+from .settings import IMAGE_GC_GRACE
+
+logger = logging.getLogger(__name__)
+
+
+def storage():
+    return Post._meta.get_field("image").storage
+
+
+def acquire(name):
+    """Пост стал ссылаться на файл."""
+    if StoredImage.objects.filter(name=name).update(refs=F("refs") + 1):
+        return
+    StoredImage.objects.update_or_create(
+        name=name, defaults={"refs": Post.objects.filter(image=name).count()})
+
+
+def release(name):
+    """Пост перестал ссылаться на файл; файл без ссылок будет удалён."""
+    StoredImage.objects.filter(name=name).update(
+        refs=Greatest(F("refs") - 1, 0))
+    transaction.on_commit(lambda: collect([name]))
+
+
+def _delete_file(name):
+    try:
+        delete_thumbnails(name, delete_file=False)
+        storage().delete(name)
+    except (SuspiciousFileOperation, OSError):
+        logger.exception("Не удалось удалить %s", name)
+
+
+def collect(names=None, grace=IMAGE_GC_GRACE):
+    """
+    Удалить файлы без ссылок вместе с миниатюрами sorl. Файлы, которые
+    загружались позже ``grace`` секунд назад, не трогаются.
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    orphans = StoredImage.objects.filter(refs=0, touched__lt=cutoff)
+    if names is not None:
+        orphans = orphans.filter(name__in=names)
+    removed = []
+    for stored in orphans.iterator():
+        # Строка удаляется только если ссылок всё ещё нет, а файл — в
+        # той же транзакции: загрузка того же содержимого ждёт её
+        # конца и не примет за свой файл, который вот-вот исчезнет.
+        with transaction.atomic():
+            deleted, _ = StoredImage.objects.filter(
+                pk=stored.pk, refs=0, touched__lt=cutoff).delete()
+            if deleted:
+                _delete_file(stored.name)
+                removed.append(stored)
+    return removed
+
+
+def reconcile(batch_size=1000):
+    """
+    Пересчитать ссылки по таблице постов (её меняют и в обход
+    сигналов) и завести строки для файлов, которых в учёте нет.
+    """
+    refs = Coalesce(Subquery(
+        Post.objects.filter(image=OuterRef("name"))
+        .order_by().values("image").annotate(count=Count("pk"))
+        .values("count")
+    ), 0)
+    changed = []
+    for stored in StoredImage.objects.annotate(actual=refs).iterator():
+        if stored.refs != stored.actual:
+            stored.refs = stored.actual
+            changed.append(stored)
+    StoredImage.objects.bulk_update(changed, ["refs"], batch_size=batch_size)
+    missing = (
+        Post.objects.exclude(image="").exclude(
+            image__in=StoredImage.objects.values("name"))
+        .order_by().values("image").annotate(count=Count("pk"))
+    )
+    StoredImage.objects.bulk_create(
+        [
+            StoredImage(name=row["image"], refs=row["count"])
+            for row in missing
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    return len(changed)
+
+
+def stray_files(grace=IMAGE_GC_GRACE):
+    """
+    Файлы в каталоге загрузок, о которых не знают ни учёт, ни посты:
+    например, брошенные временные файлы оборванных загрузок.
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    known = set(StoredImage.objects.values_list("name", flat=True))
+    known |= set(Post.objects.exclude(image="").values_list(
+        "image", flat=True))
+    root = storage().path(Post._meta.get_field("image").upload_to)
+    for path, dirs, files in os.walk(root):
+        for filename in files:
+            full = os.path.join(path, filename)
+            name = os.path.relpath(full, storage().location).replace(
+                os.sep, "/")
+            if (name not in known
+                    and os.path.getmtime(full) < cutoff.timestamp()):
+                yield name
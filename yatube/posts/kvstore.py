@@ -0,0 +1,45 @@
+from django.core.cache import caches
+from django.core.management.base import CommandError
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+
+class KVStore(KVStoreBase):
+    """
+    Хранилище ключей sorl только в кэше ``THUMBNAIL_CACHE``, без таблицы
+    thumbnail_kvstore. Потерянную запись sorl восстановит при следующем
+    ``get_thumbnail``: файл миниатюры проверяется в хранилище и заново
+    не режется.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.THUMBNAIL_CACHE]
+
+    def get_many(self, image_files):
+        """Найденные записи одним запросом к кэшу: {ключ: ImageFile}."""
+        keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+        found = self.cache.get_many(list(keys))
+        return {
+            keys[raw_key]: deserialize_image_file(value)
+            for raw_key, value in found.items() if value
+        }
+
+    def _get_raw(self, key):
+        return self.cache.get(key)
+
+    def _set_raw(self, key, value):
+        self.cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+
+    def _delete_raw(self, *keys):
+        self.cache.delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        # Кэш не перечисляет ключи, а пустой список выдал бы команды
+        # thumbnail cleanup и clear за успешные.
+        raise CommandError(
+            "Записи миниатюр хранятся в кэше и не перечисляются: они "
+            "уходят по THUMBNAIL_CACHE_TIMEOUT, а файлы без постов "
+            "удаляет команда collect_images.")
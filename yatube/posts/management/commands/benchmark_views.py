@@ -0,0 +1,213 @@
+import json
+import math
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from posts import caching
+from posts.models import Follow, Group, Post, User
+from posts.urls import app_name, urlpatterns
+
+HOST = "localhost"
+BENCHMARK_TEXT = "Текст для замера"
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет все адреса posts.urls и печатает p50/p95 задержки, "
+        "число запросов к БД и пик памяти на запрос. Формы отправляются "
+        "POST-ом, все изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--cold", action="store_true",
+            help="Сбрасывать ленты и страницы в кэше перед каждым запросом.",
+        )
+        parser.add_argument(
+            "--output", help="Сохранить результаты в JSON-файл.")
+        parser.add_argument(
+            "--baseline",
+            help="Сравнить с сохранённым JSON и упасть при регрессии.",
+        )
+        parser.add_argument(
+            "--tolerance", type=float, default=1.25,
+            help="Допустимый рост p95 относительно baseline.",
+        )
+
+    def targets(self):
+        """
+        Адрес, клиент, подготовка (вне замера) и данные POST (None —
+        запрос GET) для каждого маршрута posts.urls.
+        """
+        post = Post.objects.filter(group__isnull=False).first()
+        if post is None:
+            raise CommandError(
+                "Нет постов с группой: сначала запустите seed_benchmark.")
+        author = post.author
+        reader = User.objects.exclude(pk=author.pk).first()
+        if reader is None:
+            raise CommandError("Нужны хотя бы два пользователя.")
+        guest = Client(HTTP_HOST=HOST)
+        user = Client(HTTP_HOST=HOST)
+        user.force_login(reader)
+        owner = Client(HTTP_HOST=HOST)
+        owner.force_login(author)
+        group = Group.objects.get(pk=post.group_id)
+        args = {
+            "index": [],
+            "group_list": [group.slug],
+            "profile": [author.username],
+            "search": [],
+            "post_detail": [post.pk],
+            "post_edit": [post.pk],
+            "post_create": [],
+            "add_comment": [post.pk],
+            "comments": [post.pk],
+            "follow_index": [],
+            "profile_follow": [author.username],
+            "profile_unfollow": [author.username],
+        }
+        clients = {
+            "post_edit": owner,
+            "post_create": user,
+            "add_comment": user,
+            "follow_index": user,
+            "profile_follow": user,
+            "profile_unfollow": user,
+        }
+        queries = {
+            "search": "?" + urlencode({"q": post.text.split()[0]}),
+        }
+        forms = {
+            "post_create": {"text": BENCHMARK_TEXT, "group": group.pk},
+            "post_edit": {"text": post.text, "group": group.pk},
+            "add_comment": {"text": BENCHMARK_TEXT},
+        }
+        setups = {
+            # Подписка и отписка замеряются каждый раз с записью в БД.
+            "profile_follow": lambda: Follow.objects.filter(
+                user=reader, author=author).delete(),
+            "profile_unfollow": lambda: Follow.objects.follow(reader, author),
+        }
+        for pattern in urlpatterns:
+            if pattern.name not in args:
+                raise CommandError(f"Нет аргументов для {pattern.name}")
+            yield (
+                pattern.name,
+                reverse(f"{app_name}:{pattern.name}",
+                        args=args[pattern.name])
+                + queries.get(pattern.name, ""),
+                clients.get(pattern.name, guest),
+                setups.get(pattern.name, lambda: None),
+                forms.get(pattern.name),
+            )
+
+    def chill(self):
+        """
+        Холодный кэш лент и страниц: новая общая версия делает их
+        фрагменты и ответы недоступными, память процесса очищается.
+        Записи миниатюр и счётчики в общем кэше не трогаются.
+        """
+        caching.bump(caching.GLOBAL_SCOPE)
+        cache.clear_front()
+
+    def measure(self, client, url, setup, data, cold):
+        setup()
+        if cold:
+            self.chill()
+        tracemalloc.clear_traces()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            if data is None:
+                response = client.get(url)
+            else:
+                response = client.post(url, data)
+            elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        if response.status_code >= 400:
+            raise CommandError(f"{url}: HTTP {response.status_code}")
+        if data is not None and response.status_code != 302:
+            # Без перенаправления форма не прошла проверку и ничего
+            # не записала.
+            raise CommandError(f"{url}: форма отклонена")
+        return elapsed * 1000, len(queries), peak / 1024
+
+    def run(self, repeat, cold):
+        results = {}
+        tracemalloc.start()
+        try:
+            for name, url, client, setup, data in self.targets():
+                self.measure(client, url, setup, data, cold=False)
+                samples = [
+                    self.measure(client, url, setup, data, cold)
+                    for _ in range(repeat)
+                ]
+                latency, queries, memory = zip(*samples)
+                results[name] = {
+                    "url": url,
+                    "method": "GET" if data is None else "POST",
+                    "p50_ms": round(statistics.median(latency), 2),
+                    "p95_ms": round(percentile(latency, 95), 2),
+                    "queries": max(queries),
+                    "peak_kib": round(max(memory), 1),
+                }
+        finally:
+            tracemalloc.stop()
+        return results
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'view':<18}{'method':<8}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'queries':>10}{'peak KiB':>12}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<18}{row['method']:<8}"
+                f"{row['p50_ms']:>10}{row['p95_ms']:>10}"
+                f"{row['queries']:>10}{row['peak_kib']:>12}")
+
+    def compare(self, results, baseline, tolerance):
+        problems = []
+        for name, row in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if row["queries"] > before["queries"]:
+                problems.append(
+                    f"{name}: запросов {before['queries']} -> "
+                    f"{row['queries']}")
+            if row["p95_ms"] > before["p95_ms"] * tolerance:
+                problems.append(
+                    f"{name}: p95 {before['p95_ms']} -> {row['p95_ms']} мс")
+        return problems
+
+    def handle(self, *args, **options):
+        # Формы, подписки и комментарии меняют данные: откатываем всё.
+        with transaction.atomic():
+            results = self.run(options["repeat"], options["cold"])
+            transaction.set_rollback(True)
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                problems = self.compare(
+                    results, json.load(baseline), options["tolerance"])
+            if problems:
+                raise CommandError(
+                    "Регрессия производительности:\n" + "\n".join(problems))
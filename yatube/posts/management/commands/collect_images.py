@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.settings import IMAGE_GC_GRACE
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает ссылки на картинки и удаляет файлы, на которые "
+        "не ссылается ни один пост, вместе с их миниатюрами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace", type=int, default=IMAGE_GC_GRACE,
+            help="Не трогать файлы, загруженные позже стольких секунд назад.",
+        )
+        parser.add_argument(
+            "--scan", action="store_true",
+            help="Искать и файлы, которых нет в учёте.",
+        )
+
+    def handle(self, *args, **options):
+        fixed = images.reconcile()
+        removed = images.collect(grace=options["grace"])
+        freed = sum(stored.size for stored in removed)
+        strays = []
+        if options["scan"]:
+            strays = list(images.stray_files(options["grace"]))
+            for name in strays:
+                freed += images.storage().size(name)
+                images.storage().delete(name)
+        self.stdout.write(
+            f"Ссылок исправлено: {fixed}, файлов удалено: "
+            f"{len(removed) + len(strays)}, освобождено байт: {freed}"
+        )
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+
+from posts.feeds import FEED_ORDERING, follow_feed
+from posts.models import Comment, Group, Post, User
+from posts.paginator import CursorPaginator
+from posts.settings import POST_PER_PAGE
+
+
+class Command(BaseCommand):
+    help = "Печатает планы запросов, которые выполняют страницы лент."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sql", action="store_true",
+            help="Печатать SQL перед планом.",
+        )
+
+    def feeds(self):
+        """
+        Тройки «название — запрос — порядок» для каждой ленты на текущих
+        данных. Лента подписок сливается из нескольких запросов, и план
+        печатается для каждого.
+        """
+        ordering = ("-pub_date", "-pk")
+        yield "index", Post.objects.feed(), ordering
+        group = Group.objects.order_by("pk").first()
+        if group:
+            yield f"group_list ({group.slug})", group.posts.feed(), ordering
+        author = User.objects.filter(posts__isnull=False).first()
+        if author:
+            yield f"profile ({author.username})", author.posts.feed(), ordering
+        reader = User.objects.filter(follower__isnull=False).first()
+        if reader:
+            for number, posts in enumerate(follow_feed(reader), 1):
+                yield (
+                    f"follow_index ({reader.username}, запрос {number})",
+                    posts.feed(), FEED_ORDERING
+                )
+
+    def pages(self):
+        for name, queryset, ordering in self.feeds():
+            paginator = CursorPaginator(queryset, POST_PER_PAGE, ordering)
+            yield f"{name}: первая страница", paginator.object_list[
+                :POST_PER_PAGE + 1]
+            paginator.get_page()
+            if paginator.next_cursor:
+                yield f"{name}: по курсору", paginator.cursor_queryset(
+                    paginator.next_cursor)
+        post = Post.objects.filter(comments__isnull=False).first()
+        if post:
+            yield f"post_detail ({post.pk}): комментарии", (
+                Comment.objects.filter(post=post)
+                .select_related("author")[:POST_PER_PAGE + 1]
+            )
+
+    def handle(self, *args, **options):
+        for name, queryset in self.pages():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            if options["sql"]:
+                self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain())
+            self.stdout.write("")
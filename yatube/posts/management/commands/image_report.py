@@ -0,0 +1,65 @@
+import json
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+from posts.settings import IMAGE_FALLBACK
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает размер готовых вариантов картинок с оригиналами "
+        "и с одной миниатюрой JPEG, которую сайт отдавал раньше."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit", type=int, help="Сколько картинок проверить.")
+        parser.add_argument(
+            "--json", action="store_true", help="Вывести отчёт в JSON.")
+
+    def collect(self, limit):
+        names = (
+            Post.objects.exclude(image="").order_by()
+            .values_list("image", flat=True).distinct()
+        )
+        if limit:
+            names = names[:limit]
+        report = {"images": 0, "original": 0, "variants": {}}
+        for name in names.iterator():
+            if not default_storage.exists(name):
+                continue
+            ready, missing = thumbnails.ready(name)
+            report["images"] += 1
+            report["original"] += default_storage.size(name)
+            for image_format, variants in ready.items():
+                for width, thumbnail in variants:
+                    row = report["variants"].setdefault(
+                        f"{width}w {image_format}", {"count": 0, "bytes": 0})
+                    row["count"] += 1
+                    row["bytes"] += thumbnail.storage.size(thumbnail.name)
+        return report
+
+    def handle(self, *args, **options):
+        report = self.collect(options["limit"])
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f"Картинок: {report['images']}, "
+            f"оригиналы: {report['original'] / 1024:.1f} KiB")
+        legacy = report["variants"].get("{}w {}".format(*IMAGE_FALLBACK))
+        self.stdout.write(
+            f"{'вариант':<14}{'готово':>8}{'KiB':>10}{'средний':>10}"
+            f"{'к JPEG':>10}")
+        for key, row in sorted(report["variants"].items()):
+            average = row["bytes"] / row["count"]
+            versus = "-"
+            if legacy:
+                legacy_average = legacy["bytes"] / legacy["count"]
+                versus = f"{average / legacy_average - 1:+.0%}"
+            self.stdout.write(
+                f"{key:<14}{row['count']:>8}{row['bytes'] / 1024:>10.1f}"
+                f"{average / 1024:>10.1f}{versus:>10}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import feeds
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames", nargs="*",
+            help="Пользователи; по умолчанию все, у кого есть подписки.",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(follower__isnull=False).distinct()
+        if options["usernames"]:
+            users = User.objects.filter(username__in=options["usernames"])
+            missing = set(options["usernames"]) - set(
+                users.values_list("username", flat=True))
+            if missing:
+                raise CommandError(
+                    f"Пользователи не найдены: {', '.join(sorted(missing))}")
+        rebuilt = 0
+        for user in users.iterator():
+            feeds.rebuild(user)
+            rebuilt += 1
+        self.stdout.write(f"Пересобрано лент: {rebuilt}")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Post
+from posts.settings import SEARCH_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает полнотекстовый индекс постов (нужно после "
+        "массовых вставок и update() в обход сигналов)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=SEARCH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        search.rebuild(Post.objects.all(), batch_size=options["batch_size"])
+        self.stdout.write(
+            f"Проиндексировано постов: {Post.objects.count()}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import caching, counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики и исправляет расхождения."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Размер пачки пользователей и постов.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        users = counters.reconcile_users(batch_size=batch_size)
+        posts = counters.reconcile_posts(batch_size=batch_size)
+        if users or posts:
+            # Счётчики выводятся на страницах с ETag: сбрасываем все.
+            caching.bump(caching.GLOBAL_SCOPE)
+        self.stdout.write(
+            f"Исправлено: пользователей {users}, постов {posts}")
@@ -0,0 +1,177 @@
+import random
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from faker import Faker
+from PIL import Image
+
+from posts import caching, counters, feeds, images, search
+from posts.models import Comment, Follow, Group, Post, User
+
+IMAGE_SIZE = (960, 640)
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу воспроизводимыми синтетическими данными "
+        "для нагрузочных замеров."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument(
+            "--follows", type=int, default=30,
+            help="Среднее число подписок на пользователя.",
+        )
+        parser.add_argument(
+            "--alpha", type=float, default=1.2,
+            help="Показатель степенного закона популярности авторов.",
+        )
+        parser.add_argument(
+            "--images", type=int, default=50,
+            help="Сколько разных картинок сгенерировать для постов.",
+        )
+        parser.add_argument(
+            "--image-ratio", type=float, default=0.3,
+            help="Доля постов с картинкой.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def bulk(self, model, objects):
+        created = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                created += len(batch)
+                batch = []
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        created += len(batch)
+        self.stdout.write(f"{model._meta.verbose_name_plural}: {created}")
+
+    def make_users(self, count):
+        password = make_password(None)
+        self.bulk(User, (
+            User(
+                username=f"{self.prefix}_{i}",
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=self.fake.email(),
+                password=password,
+            )
+            for i in range(count)
+        ))
+        return list(self.users.order_by("pk").values_list("pk", flat=True))
+
+    def make_groups(self, count):
+        self.bulk(Group, (
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f"{self.prefix}-{i}",
+                description=self.fake.paragraph(),
+            )
+            for i in range(count)
+        ))
+        return list(
+            Group.objects.filter(slug__startswith=f"{self.prefix}-")
+            .values_list("pk", flat=True)
+        )
+
+    def make_images(self, count):
+        names = []
+        for i in range(count):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new("RGB", IMAGE_SIZE, color).save(buffer, "JPEG")
+            names.append(images.storage().save(
+                f"posts/{self.prefix}_{i}.jpg",
+                ContentFile(buffer.getvalue()),
+            ))
+        self.stdout.write(f"Картинки: {len(names)}")
+        return names
+
+    def popularity(self, count):
+        """
+        Накопленные веса авторов по закону Ципфа: немногие авторы
+        пишут и собирают подписчиков больше всех остальных.
+        """
+        return list(accumulate(
+            1 / (rank + 1) ** self.alpha for rank in range(count)))
+
+    def handle(self, *args, **options):
+        self.seed = options["seed"]
+        self.alpha = options["alpha"]
+        self.batch_size = options["batch_size"]
+        self.random = random.Random(self.seed)
+        self.fake = Faker("ru_RU")
+        self.fake.seed_instance(self.seed)
+        self.prefix = f"bench{self.seed}"
+        self.users = User.objects.filter(
+            username__startswith=f"{self.prefix}_")
+
+        users = self.make_users(options["users"])
+        groups = self.make_groups(options["groups"])
+        pictures = self.make_images(options["images"])
+        cum_weights = self.popularity(len(users))
+        authors = self.random.sample(users, len(users))
+
+        self.bulk(Post, (
+            Post(
+                author_id=self.random.choices(
+                    authors, cum_weights=cum_weights)[0],
+                group_id=(
+                    self.random.choice(groups)
+                    if groups and self.random.random() < 0.7 else None
+                ),
+                text=self.fake.text(max_nb_chars=600),
+                image=(
+                    self.random.choice(pictures)
+                    if pictures
+                    and self.random.random() < options["image_ratio"]
+                    else ""
+                ),
+            )
+            for _ in range(options["posts"])
+        ))
+        posts = Post.objects.filter(author__in=self.users)
+        post_ids = list(posts.values_list("pk", flat=True))
+
+        def follows():
+            for user in users:
+                count = min(
+                    len(users) - 1,
+                    int(self.random.expovariate(1 / options["follows"])),
+                )
+                chosen = set(self.random.choices(
+                    authors, cum_weights=cum_weights, k=count))
+                for author in chosen - {user}:
+                    yield Follow(user_id=user, author_id=author)
+
+        self.bulk(Follow, follows())
+        if post_ids:
+            self.bulk(Comment, (
+                Comment(
+                    post_id=self.random.choice(post_ids),
+                    author_id=self.random.choice(users),
+                    text=self.fake.sentence(),
+                )
+                for _ in range(options["comments"])
+            ))
+
+        # Массовые вставки обходят сигналы: досчитываем производные данные.
+        counters.reconcile_users(self.users, batch_size=self.batch_size)
+        counters.reconcile_posts(posts, batch_size=self.batch_size)
+        for user in self.users.iterator():
+            feeds.rebuild(user)
+        search.rebuild(Post.objects.all(), batch_size=self.batch_size)
+        images.reconcile(batch_size=self.batch_size)
+        caching.bump(caching.GLOBAL_SCOPE, caching.index_scope())
+        self.stdout.write(self.style.SUCCESS("Готово"))
@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import caching, thumbnails
+from posts.models import Post
+from posts.settings import THUMBNAIL_WORKERS
+
+
+class Command(BaseCommand):
+    help = (
+        "Готовит миниатюры всех размеров для картинок существующих "
+        "постов в несколько потоков."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=THUMBNAIL_WORKERS,
+            help="Число потоков; 0 — всё в текущем потоке.",
+        )
+        parser.add_argument(
+            "--missing", action="store_true",
+            help="Только картинки, у которых нет готовых миниатюр.",
+        )
+
+    def names(self, missing):
+        names = (
+            Post.objects.exclude(image="").order_by()
+            .values_list("image", flat=True).distinct()
+        )
+        for name in names.iterator():
+            if missing and not thumbnails.ready(name)[1]:
+                continue
+            yield name
+
+    def handle(self, *args, **options):
+        names = list(self.names(options["missing"]))
+        if options["workers"]:
+            with ThreadPoolExecutor(options["workers"]) as executor:
+                list(executor.map(thumbnails.generate, names))
+        else:
+            for name in names:
+                thumbnails.generate(name)
+        # Заглушки могли попасть в любые ленты: сбрасываем все разом.
+        caching.bump(caching.GLOBAL_SCOPE)
+        self.stdout.write(f"Картинок обработано: {len(names)}")
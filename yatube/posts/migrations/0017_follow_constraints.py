@@ -0,0 +1,77 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:40
+
+from django.db import migrations, models
+import django.db.models.expressions
+from django.db.models import Count, F, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def delete_in_batches(queryset):
+    ids = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        queryset.model.objects.filter(
+            pk__in=ids[start:start + BATCH_SIZE]).delete()
+
+
+def recount_follows(apps, user_ids):
+    """Счётчики подписок из 0015 учли удалённые дубли — пересчитать."""
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    counts = {
+        field: Coalesce(Subquery(
+            Follow.objects.filter(**{source: OuterRef('user')})
+            .order_by().values(source)
+            .annotate(count=Count('pk')).values('count')
+        ), 0)
+        for field, source in [
+            ('followers_count', 'author'), ('following_count', 'user')]
+    }
+    user_ids = sorted(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        UserStats.objects.filter(
+            user__in=user_ids[start:start + BATCH_SIZE]).update(**counts)
+
+
+def deduplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    self_follows = Follow.objects.filter(user=F('author'))
+    affected = set(self_follows.values_list('user', flat=True))
+    delete_in_batches(self_follows)
+    duplicates = (
+        Follow.objects.values('user', 'author')
+        .annotate(count=Count('pk'), keep=Min('pk'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for row in duplicates.iterator():
+        affected.update([row['user'], row['author']])
+        delete_in_batches(
+            Follow.objects.filter(user=row['user'], author=row['author'])
+            .exclude(pk=row['keep'])
+        )
+    recount_follows(apps, affected)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_follow_user_author_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_follows, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='posts_follow_user_author_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='posts_follow_unique_user_author'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='posts_follow_not_self'),
+        ),
+    ]
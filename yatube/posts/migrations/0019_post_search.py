@@ -0,0 +1,63 @@
+import re
+
+from django.db import migrations
+
+SQLITE_TABLE = 'posts_post_fts'
+POSTGRES_INDEX = 'posts_post_text_fts_idx'
+WORD = re.compile(r'\w+')
+BATCH_SIZE = 1000
+
+
+def fill_sqlite_index(apps, schema_editor):
+    # Индекс хранит основы слов, поэтому стеммер нужен и здесь. После
+    # его изменений индекс пересобирает команда rebuild_search_index.
+    from posts.stemmer import stem
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.using(schema_editor.connection.alias)
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for pk, text in posts.values_list('pk', 'text').iterator():
+            body = ' '.join(
+                stem(word) for word in WORD.findall(text.lower()))
+            batch.append((pk, body))
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(
+                    f'INSERT INTO {SQLITE_TABLE} (rowid, body) '
+                    f'VALUES (%s, %s)', batch)
+                batch = []
+        cursor.executemany(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, body) VALUES (%s, %s)',
+            batch)
+
+
+def install(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} '
+            f"USING fts5(body, tokenize='unicode61 remove_diacritics 2')")
+        fill_sqlite_index(apps, schema_editor)
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} '
+            f"ON posts_post USING GIN (to_tsvector("
+            f"'russian'::regconfig, COALESCE(text, '')))")
+
+
+def uninstall(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
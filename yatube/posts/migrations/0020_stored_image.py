@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:05
+
+from django.db import migrations, models
+import django.utils.timezone
+import posts.storage
+
+
+def count_references(apps, schema_editor):
+    """Старые картинки остаются на своих местах, но попадают в учёт."""
+    Post = apps.get_model('posts', 'Post')
+    StoredImage = apps.get_model('posts', 'StoredImage')
+    rows = (
+        Post.objects.using(schema_editor.connection.alias)
+        .exclude(image='').order_by().values('image')
+        .annotate(refs=models.Count('pk'))
+    )
+    StoredImage.objects.using(schema_editor.connection.alias).bulk_create(
+        StoredImage(name=row['image'], refs=row['refs']) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Путь')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Размер')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('touched', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Последняя загрузка')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_post_fields(apps, schema_editor):
+    """Автор и дата существующих записей берутся из их постов."""
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    post = Post.objects.filter(pk=models.OuterRef('post_id'))
+    FeedEntry.objects.using(schema_editor.connection.alias).update(
+        author_id=models.Subquery(post.values('author_id')[:1]),
+        pub_date=models.Subquery(post.values('pub_date')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0020_stored_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedentry',
+            name='author',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор поста'),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='pub_date',
+            field=models.DateTimeField(null=True, verbose_name='Дата поста'),
+        ),
+        migrations.RunPython(copy_post_fields, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='feedentry',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор поста'),
+        ),
+        migrations.AlterField(
+            model_name='feedentry',
+            name='pub_date',
+            field=models.DateTimeField(verbose_name='Дата поста'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'pub_date', 'post'], name='posts_feed_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+def mark_large_authors(apps, schema_editor):
+    """Авторы выше порога и до миграции читались на лету."""
+    from posts.settings import FANOUT_MAX_FOLLOWERS
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.using(schema_editor.connection.alias).filter(
+        followers_count__gt=FANOUT_MAX_FOLLOWERS).update(feed_fanout=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_feedentry_pub_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='feed_fanout',
+            field=models.BooleanField(default=True, verbose_name='Посты раскладываются по лентам'),
+        ),
+        migrations.RunPython(mark_large_authors, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .storage import ContentAddressedStorage
 
 RE_FOLLOW_ERROR = 'Повторная подписка'
 FOLLOW_TO_YOURSELF_ERROR = 'Подписка на себя'
@@ -21,6 +24,16 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа одним запросом, без лишних полей."""
+        return self.select_related("author", "group").only(
+            "text", "pub_date", "image", "author", "group",
+            "author__username", "author__first_name", "author__last_name",
+            "group__slug", "group__title",
+        )
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name="Текст")
     pub_date = models.DateTimeField(auto_now_add=True, verbose_name="Дата")
@@ -41,11 +54,33 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Комментариев"
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=["pub_date", "id"],
+                name="posts_post_pub_date_id_idx"
+            ),
+            models.Index(
+                fields=["author", "pub_date"],
+                name="posts_post_author_date_idx"
+            ),
+            models.Index(
+                fields=["group", "pub_date"],
+                name="posts_post_group_date_idx"
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -70,6 +105,13 @@ class Comment(models.Model):
     created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        ordering = ("created", "id")
+        indexes = [
+            models.Index(
+                fields=["post", "created"],
+                name="posts_comment_post_date_idx"
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -77,6 +119,36 @@ class Comment(models.Model):
         return self.text[:15]
 
 
+class FollowQuerySet(models.QuerySet):
+    def is_following(self, user, author):
+        """Подписан ли пользователь на автора."""
+        return self.filter(user=user, author=author).exists()
+
+    def following_ids(self, user, authors):
+        """Множество id авторов из ``authors``, на которых подписан user."""
+        return set(
+            self.filter(user=user, author__in=authors)
+            .values_list("author_id", flat=True)
+        )
+
+    def follow(self, user, author):
+        """
+        Подписать пользователя на автора одной вставкой. Повторная
+        подписка и подписка на себя отсекаются ограничениями БД.
+        Возвращает True, если подписка создана.
+        """
+        try:
+            with transaction.atomic():
+                self.create(user=user, author=author)
+        except IntegrityError:
+            return False
+        return True
+
+    def mutual(self, user):
+        """Пользователи, с которыми у user взаимная подписка."""
+        return User.objects.filter(following__user=user, follower__author=user)
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -91,7 +163,19 @@ class Follow(models.Model):
         verbose_name="Избранный автор"
     )
 
+    objects = FollowQuerySet.as_manager()
+
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"],
+                name="posts_follow_unique_user_author"
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F("author")),
+                name="posts_follow_not_self"
+            ),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
@@ -101,8 +185,96 @@ class Follow(models.Model):
         )
 
     def clean(self):
-        if Follow.objects.filter(user=self.user, author=self.author).exists():
+        if Follow.objects.is_following(self.user, self.author):
             raise ValidationError(RE_FOLLOW_ERROR)
         if self.user == self.author:
             raise ValidationError(FOLLOW_TO_YOURSELF_ERROR)
         return True
+
+
+class FeedEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Читатель"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Пост"
+    )
+    # Копии полей поста: лента читается по индексу (user, pub_date,
+    # post) без сортировки, записи автора удаляются без join.
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор поста"
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата поста")
+
+    class Meta:
+        unique_together = ("user", "post")
+        indexes = [
+            models.Index(
+                fields=["user", "pub_date", "post"],
+                name="posts_feed_user_date_idx"
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self) -> str:
+        return f'{self.user.username}: {self.post}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="stats",
+        verbose_name="Пользователь"
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name="Постов")
+    comments_count = models.PositiveIntegerField(
+        default=0, verbose_name="Комментариев")
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name="Подписчиков")
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name="Подписок")
+    feed_fanout = models.BooleanField(
+        default=True, verbose_name="Посты раскладываются по лентам")
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self) -> str:
+        return f'Статистика {self.user.username}'
+
+
+class StoredImage(models.Model):
+    """
+    Файл в контентно-адресуемом хранилище и число постов, которые на
+    него ссылаются.
+    """
+    name = models.CharField(
+        max_length=255, unique=True, verbose_name="Путь")
+    size = models.PositiveIntegerField(default=0, verbose_name="Размер")
+    refs = models.PositiveIntegerField(default=0, verbose_name="Ссылок")
+    touched = models.DateTimeField(
+        default=timezone.now, db_index=True,
+        verbose_name="Последняя загрузка"
+    )
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,231 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q
+
+FORWARD = "next"
+BACKWARD = "prev"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинатор: страница выбирается условием по ключу сортировки
+    (по умолчанию ``(pub_date, pk)``) вместо ``COUNT(*)`` и ``OFFSET``.
+
+    Позиция передаётся непрозрачным курсором, поэтому новые записи не
+    сдвигают уже открытые страницы. Возвращает обычный ``Page``: методы
+    ``has_next``/``has_previous``/``number`` работают без подсчёта всех
+    объектов, а ``num_pages`` известен только «до следующей страницы».
+    """
+
+    def __init__(self, object_list, per_page, ordering=("-pub_date", "-pk")):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = tuple(ordering)
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def num_pages(self):
+        return self._number + int(self._has_next)
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def get_page(self, number=None, cursor=None):
+        """
+        Вернуть страницу по курсору, а без него — по номеру страницы
+        (для старых ссылок ``?page=``). Некорректные значения
+        приводят к первой странице.
+        """
+        if cursor:
+            try:
+                return self.page_from_cursor(cursor)
+            except InvalidCursor:
+                pass
+        try:
+            number = self.validate_number(number)
+        except (PageNotAnInteger, EmptyPage):
+            number = 1
+        return self.page(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            return self.page(1)
+        return self._build_page(rows, number)
+
+    def cursor_queryset(self, cursor):
+        """Запрос строк страницы по курсору (с одной строкой «про запас»)."""
+        direction, values, number = self.decode_cursor(cursor)
+        backward = direction == BACKWARD
+        return (
+            self._ordered(backward)
+            .filter(self._seek(values, backward))[:self.per_page + 1]
+        )
+
+    def cursor_rows(self, cursor):
+        return list(self.cursor_queryset(cursor))
+
+    def page_from_cursor(self, cursor):
+        direction, values, number = self.decode_cursor(cursor)
+        backward = direction == BACKWARD
+        rows = self.cursor_rows(cursor)
+        if not rows:
+            return self.page(1)
+        if backward:
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return self._build_page(
+                rows, number if has_previous else 1, has_next=True)
+        return self._build_page(rows, number)
+
+    def _build_page(self, rows, number, has_next=None):
+        if has_next is None:
+            has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        self._number = number
+        self._has_next = has_next
+        if rows and has_next:
+            self.next_cursor = self.encode_cursor(
+                FORWARD, self._key(rows[-1]), number + 1)
+        if rows and number > 1:
+            self.previous_cursor = self.encode_cursor(
+                BACKWARD, self._key(rows[0]), number - 1)
+        return Page(rows, number, self)
+
+    def _ordered(self, backward):
+        if not backward:
+            return self.object_list
+        return self.object_list.order_by(*(
+            name[1:] if name.startswith("-") else f"-{name}"
+            for name in self.ordering
+        ))
+
+    def _seek(self, values, backward):
+        """Условие «строго после ключа» в лексикографическом порядке."""
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith("-") != backward
+            lookup = "lt" if descending else "gt"
+            step = Q(**{f"{name.lstrip('-')}__{lookup}": values[index]})
+            for prev_name, prev_value in zip(self.ordering, values[:index]):
+                step &= Q(**{prev_name.lstrip("-"): prev_value})
+            condition |= step
+        return condition
+
+    def _fields(self):
+        """Пары (атрибут объекта, поле) ключа; поле может быть аннотацией."""
+        meta = self.object_list.model._meta
+        annotations = self.object_list.query.annotations
+        fields = []
+        for name in self.ordering:
+            name = name.lstrip("-")
+            if name in annotations:
+                fields.append((name, annotations[name].output_field))
+            else:
+                field = meta.pk if name == "pk" else meta.get_field(name)
+                fields.append((field.attname, field))
+        return fields
+
+    def _key(self, obj):
+        """Значения ключа объекта или строки ``values()`` (словаря)."""
+        if isinstance(obj, dict):
+            return [obj[attname] for attname, field in self._fields()]
+        return [getattr(obj, attname) for attname, field in self._fields()]
+
+    def encode_cursor(self, direction, values, number):
+        payload = json.dumps(
+            [direction, number, [
+                value.isoformat() if hasattr(value, "isoformat") else value
+                for value in values
+            ]],
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(
+            payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = base64.urlsafe_b64decode(
+                cursor + "=" * (-len(cursor) % 4))
+            direction, number, raw_values = json.loads(payload)
+            values = [
+                field.to_python(value)
+                for (attname, field), value in zip(
+                    self._fields(), raw_values)
+            ]
+            number = self.validate_number(number)
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError,
+                ValidationError, PageNotAnInteger, EmptyPage):
+            raise InvalidCursor(cursor)
+        if (direction not in (FORWARD, BACKWARD)
+                or len(values) != len(self.ordering)
+                or None in values):
+            raise InvalidCursor(cursor)
+        return direction, values, number
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """
+    Keyset-пагинатор по нескольким запросам с общим ключом сортировки.
+    Каждый запрос читается по своему индексу не дальше одной страницы,
+    а строки сливаются в Python: так не нужен OR между условиями, из-за
+    которого СУБД сортирует все подходящие строки. Ключ у строк разных
+    запросов должен совпадать, строки с одинаковым ключом выводятся
+    один раз; все поля ключа сортируются в одну сторону.
+    """
+
+    def __init__(self, querysets, per_page, ordering=("-pub_date", "-pk")):
+        super().__init__(querysets[0], per_page, ordering)
+        self.querysets = [
+            queryset.order_by(*ordering) for queryset in querysets]
+
+    def _merged(self, limit, values=None, backward=False):
+        rows = []
+        for queryset in self.querysets:
+            source = CursorPaginator(queryset, limit, self.ordering)
+            queryset = source._ordered(backward)
+            if values is not None:
+                queryset = queryset.filter(source._seek(values, backward))
+            rows.extend(queryset[:limit])
+        unique = {}
+        for row in rows:
+            unique.setdefault(tuple(self._key(row)), row)
+        descending = self.ordering[0].startswith("-") != backward
+        return [
+            unique[key] for key in sorted(unique, reverse=descending)
+        ][:limit]
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = self._merged(bottom + self.per_page + 1)[bottom:]
+        if not rows and number > 1:
+            return self.page(1)
+        return self._build_page(rows, number)
+
+    def cursor_queryset(self, cursor):
+        raise NotImplementedError(
+            "У слитой ленты нет одного запроса, см. cursor_rows().")
+
+    def cursor_rows(self, cursor):
+        direction, values, number = self.decode_cursor(cursor)
+        return self._merged(
+            self.per_page + 1, values, direction == BACKWARD)
@@ -0,0 +1,186 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .settings import (
+    SEARCH_BACKENDS, SEARCH_BATCH_SIZE, SEARCH_SNIPPET_WORDS
+)
+from .stemmer import stem
+
+WORD = re.compile(r"\w+")
+# Поле ранга, которое добавляет к постам любой бэкенд: чем больше,
+# тем выше пост в выдаче.
+RANK = "search_rank"
+ORDERING = (f"-{RANK}", "-pk")
+
+
+def terms(text):
+    """Основы слов текста: по ним строится индекс и ищутся посты."""
+    return [stem(word) for word in WORD.findall(text.lower())]
+
+
+class SearchBackend:
+    """
+    Бэкенд поиска: ``index``/``remove`` вызывают сигналы постов,
+    ``search`` — виды. Таблицу или индекс создаёт миграция 0019.
+    """
+
+    def index(self, connection, rows):
+        pass
+
+    def remove(self, connection, pks):
+        pass
+
+    def clear(self, connection):
+        pass
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class SqliteBackend(SearchBackend):
+    """
+    Индекс FTS5 с основами слов: стемминг делается в Python, поэтому
+    индекс обновляется сигналами, а не триггерами.
+    """
+
+    table = "posts_post_fts"
+
+    def index(self, connection, rows):
+        """Переиндексировать пары (pk, text)."""
+        rows = [(pk, " ".join(terms(text))) for pk, text in rows]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(pk,) for pk, body in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)",
+                rows)
+
+    def remove(self, connection, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(pk,) for pk in pks])
+
+    def clear(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def search(self, queryset, query):
+        words = terms(query)
+        if not words:
+            return queryset.none()
+        match = " ".join(f'"{word}"' for word in words)
+        table = queryset.model._meta.db_table
+        # Таблица FTS присоединяется один раз: MATCH и rank (bm25)
+        # считаются за один проход по индексу, а не подзапросом на
+        # каждую строку.
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                f'{self.table}.rowid = "{table}"."id"',
+                f"{self.table} MATCH %s",
+            ],
+            params=[match],
+        ).annotate(**{RANK: RawSQL(
+            f"-{self.table}.rank", [], output_field=FloatField())})
+
+
+class PostgresBackend(SearchBackend):
+    """
+    ``tsvector`` с конфигурацией russian: стемминг и ранжирование
+    делает сам Postgres, индекс GIN по выражению обновлять не нужно.
+    """
+
+    config = "russian"
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector
+        )
+        vector = SearchVector("text", config=self.config)
+        search_query = SearchQuery(query, config=self.config)
+        return queryset.annotate(
+            search_vector=vector,
+            **{RANK: SearchRank(vector, search_query)},
+        ).filter(search_vector=search_query)
+
+
+class BasicBackend(SearchBackend):
+    """Запасной вариант для прочих СУБД: поиск подстрок без ранга."""
+
+    def search(self, queryset, query):
+        words = WORD.findall(query)
+        if not words:
+            return queryset.none()
+        condition = Q()
+        for word in words:
+            condition &= Q(text__icontains=word)
+        return queryset.filter(condition).annotate(
+            **{RANK: Value(0.0, output_field=FloatField())})
+
+
+def get_backend(vendor=None):
+    path = SEARCH_BACKENDS.get(
+        vendor or connection.vendor, "posts.search.BasicBackend")
+    return import_string(path)()
+
+
+def search(queryset, query):
+    """Посты, подходящие под запрос, с рангом в поле ``search_rank``."""
+    return get_backend().search(queryset, query)
+
+
+def index(posts):
+    get_backend().index(connection, [(post.pk, post.text) for post in posts])
+
+
+def remove(pks):
+    get_backend().remove(connection, pks)
+
+
+def rebuild(posts, batch_size=SEARCH_BATCH_SIZE, using=connection):
+    """Построить индекс заново по строкам ``posts`` (pk, text)."""
+    backend = get_backend(using.vendor)
+    backend.clear(using)
+    batch = []
+    for row in posts.values_list("pk", "text").iterator():
+        batch.append(row)
+        if len(batch) >= batch_size:
+            backend.index(using, batch)
+            batch = []
+    backend.index(using, batch)
+
+
+def highlight(text, query, words=SEARCH_SNIPPET_WORDS):
+    """
+    Фрагмент текста вокруг первого совпадения, найденные слова
+    обёрнуты в ``<mark>``.
+    """
+    wanted = set(terms(query))
+    tokens = list(WORD.finditer(text))
+    first = next(
+        (i for i, token in enumerate(tokens)
+         if stem(token.group()) in wanted), 0)
+    start = max(0, first - words // 3)
+    window = tokens[start:start + words]
+    if not window:
+        return escape(text)
+    parts = ["…" if start else ""]
+    position = window[0].start() if start else 0
+    for token in window:
+        parts.append(escape(text[position:token.start()]))
+        word = escape(token.group())
+        parts.append(
+            f"<mark>{word}</mark>" if stem(token.group()) in wanted
+            else word)
+        position = token.end()
+    parts.append(
+        "…" if start + words < len(tokens) else escape(text[position:]))
+    return mark_safe("".join(parts))
@@ -1 +1,72 @@
 POST_PER_PAGE = 10
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты подмешиваются в ленту при чтении. Автор
+# перестаёт раскладываться выше FANOUT_MAX_FOLLOWERS и возвращается
+# к раскладке только при FANOUT_RESUME_FOLLOWERS и меньше, чтобы
+# подписки у порога не пересобирали ленты туда и обратно.
+FANOUT_MAX_FOLLOWERS = 1000
+FANOUT_RESUME_FOLLOWERS = 900
+FEED_BATCH_SIZE = 1000
+# При подписке и возврате к раскладке в ленты копируются только
+# последние посты автора — примерно страница ленты.
+FEED_BACKFILL_POSTS = POST_PER_PAGE
+# 0 — переключать раскладку автора в том же потоке.
+FEED_WORKERS = 1
+# Фрагменты лент сбрасываются сигналами, время жизни — страховка.
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+# Готовые страницы для гостей; сбрасываются так же, как фрагменты.
+PAGE_CACHE_TIMEOUT = 60 * 60
+COMMENTS_PER_PAGE = 20
+# Порядок комментариев: ключ параметра ?order= -> сортировка курсора.
+COMMENT_ORDERINGS = {
+    "oldest": ("created", "pk"),
+    "newest": ("-created", "-pk"),
+}
+# Бэкенд полнотекстового поиска по connection.vendor.
+SEARCH_BACKENDS = {
+    "sqlite": "posts.search.SqliteBackend",
+    "postgresql": "posts.search.PostgresBackend",
+}
+SEARCH_BATCH_SIZE = 1000
+SEARCH_SNIPPET_WORDS = 30
+SEARCH_MAX_QUERY_LENGTH = 200
+# Картинка поста режется до пропорций карточки в нескольких ширинах и
+# форматах, браузер выбирает вариант по srcset. Форматы — в порядке
+# предпочтения; те, что не умеет сохранять Pillow, пропускаются. JPEG
+# нужен всегда: это запасной <img>.
+IMAGE_ASPECT = (960, 339)
+IMAGE_WIDTHS = (480, 960, 1440)
+IMAGE_FORMATS = ("AVIF", "WEBP", "JPEG")
+IMAGE_FALLBACK = (960, "JPEG")
+IMAGE_SIZES = "(max-width: 960px) 100vw, 960px"
+# Миниатюры: (ширина, формат) -> (геометрия sorl, опции). Все они
+# готовятся заранее пулом потоков после сохранения поста.
+THUMBNAIL_GEOMETRIES = {
+    (width, image_format): (
+        f"{width}x{round(width * IMAGE_ASPECT[1] / IMAGE_ASPECT[0])}",
+        {"crop": "center", "upscale": True, "format": image_format},
+    )
+    for width in IMAGE_WIDTHS
+    for image_format in IMAGE_FORMATS
+}
+# 0 — готовить миниатюры в том же потоке.
+THUMBNAIL_WORKERS = 2
+# Картинка в очереди или с ошибкой при нарезке снова ставится в очередь
+# не раньше, чем через столько секунд.
+THUMBNAIL_RETRY_DELAY = 5 * 60
+THUMBNAIL_PLACEHOLDER = "img/placeholder.svg"
+IMAGE_HASH_ALGORITHM = "sha256"
+# Файл без ссылок удаляется не раньше, чем через столько секунд после
+# последней загрузки: пост с только что загруженной картинкой может
+# быть ещё не сохранён.
+IMAGE_GC_GRACE = 60 * 60
+# Загрузка картинок: лимиты проверяются по мере приёма файла, размеры —
+# по заголовку, который ищется в первых IMAGE_HEADER_BYTES байтах.
+IMAGE_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_SIDE = 8000
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_HEADER_BYTES = 256 * 1024
+# Картинки с EXIF пересохраняются без метаданных; одновременно
+# раскодируется не больше IMAGE_SANITIZE_WORKERS картинок.
+IMAGE_SANITIZE_WORKERS = 2
+IMAGE_JPEG_QUALITY = 90
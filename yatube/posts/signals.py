@@ -0,0 +1,205 @@
+import threading
+
+from django.db.models import Count
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from . import caching, counters, feeds, images, search, thumbnails
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля пользователя, которые не выводятся в лентах.
+USER_SERVICE_FIELDS = {"last_login", "password"}
+
+# Посты и пользователи, которые удаляются в этом потоке. Их комментарии
+# удаляются каскадом, и счётчики с кэшем обновляются один раз в
+# pre_delete, а не на каждый комментарий.
+_deleting = threading.local()
+
+
+def deleting(kind):
+    if not hasattr(_deleting, kind):
+        setattr(_deleting, kind, set())
+    return getattr(_deleting, kind)
+
+
+def cascaded(comment):
+    """Удаляется ли комментарий вместе со своим постом или автором."""
+    return (comment.post_id in deleting("posts")
+            or comment.author_id in deleting("users"))
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_delete, sender=User)
+def count_user_comments(sender, instance, **kwargs):
+    """
+    Комментарии пользователя к чужим постам: одно обновление
+    comment_count на пост и один сброс их лент.
+    """
+    deleting("users").add(instance.pk)
+    posts = Comment.objects.filter(author=instance).exclude(
+        post__author=instance).order_by().values(
+        "post", "post__author", "post__group").annotate(count=Count("pk"))
+    scopes = []
+    for row in posts:
+        counters.bump_post(row["post"], -row["count"])
+        scopes.extend(thumbnails.feed_scopes(Post(
+            pk=row["post"], author_id=row["post__author"],
+            group_id=row["post__group"])))
+    if scopes:
+        caching.bump(*scopes)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    deleting("users").discard(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def expire_author_feeds(sender, instance, created, update_fields=None,
+                        **kwargs):
+    if created or (update_fields and set(update_fields)
+                   <= USER_SERVICE_FIELDS):
+        return
+    caching.bump(caching.GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def expire_group_feeds(sender, **kwargs):
+    caching.bump(caching.GLOBAL_SCOPE)
+
+
+@receiver(post_init, sender=Post)
+def remember_loaded(sender, instance, **kwargs):
+    instance._loaded_group_id = instance.__dict__.get("group_id")
+    # Новый пост получает загруженный файл, а не имя в хранилище.
+    image = instance.__dict__.get("image")
+    instance._loaded_image = image if isinstance(image, str) else ""
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def expire_post_feeds(sender, instance, **kwargs):
+    group_ids = {instance.group_id, instance._loaded_group_id} - {None}
+    caching.bump(
+        caching.index_scope(),
+        caching.profile_scope(instance.author_id),
+        caching.post_scope(instance.pk),
+        *(caching.group_scope(group_id) for group_id in group_ids),
+    )
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "text" in update_fields:
+        search.index([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def track_image(sender, instance, raw=False, **kwargs):
+    """Пересчитать ссылки на файлы и заранее нарезать миниатюры."""
+    if raw or "image" in instance.get_deferred_fields():
+        return
+    name = instance.image.name or ""
+    if name != instance._loaded_image:
+        if name:
+            images.acquire(name)
+            thumbnails.enqueue(instance)
+        if instance._loaded_image:
+            images.release(instance._loaded_image)
+    instance._loaded_image = name
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    if instance._loaded_image:
+        images.release(instance._loaded_image)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, "posts_count", 1)
+        feeds.fan_out(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def count_post_comments(sender, instance, **kwargs):
+    """
+    Счётчики авторов комментариев поста: один UPDATE на автора. Ленты
+    поста сбросит expire_post_feeds, comment_count удаляется с постом.
+    """
+    deleting("posts").add(instance.pk)
+    authors = Comment.objects.filter(post=instance).order_by().values(
+        "author").annotate(count=Count("pk"))
+    for row in authors:
+        counters.bump_user(row["author"], "comments_count", -row["count"])
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "posts_count", -1)
+    deleting("posts").discard(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_post_page(sender, instance, **kwargs):
+    """
+    Число комментариев выводится на странице поста и в карточках лент
+    API, поэтому сбрасываются все ленты, где есть пост.
+    """
+    if cascaded(instance):
+        return
+    if Comment._meta.get_field("post").is_cached(instance):
+        post = instance.post
+    else:
+        post = Post.objects.filter(pk=instance.post_id).only(
+            "author", "group").first()
+    if post is None:
+        caching.bump(caching.post_scope(instance.post_id))
+    else:
+        caching.bump(*thumbnails.feed_scopes(post))
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, "comments_count", 1)
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    if cascaded(instance):
+        return
+    counters.bump_user(instance.author_id, "comments_count", -1)
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.user_id, "following_count", 1)
+        counters.bump_user(instance.author_id, "followers_count", 1)
+        feeds.followed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_feed(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, "following_count", -1)
+    counters.bump_user(instance.author_id, "followers_count", -1)
+    feeds.unfollowed(instance.user_id, instance.author_id)
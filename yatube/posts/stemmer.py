@@ -0,0 +1,106 @@
+"""
+Стеммер Snowball для русского языка
+(https://snowballstem.org/algorithms/russian/stemmer.html).
+"""
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND = (
+    (("в", "вши", "вшись"), True),
+    (("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"), False),
+)
+REFLEXIVE = ((("ся", "сь"), False),)
+ADJECTIVE = ((
+    ("ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем",
+     "им", "ым", "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю",
+     "ая", "яя", "ою", "ею"),
+    False,
+),)
+PARTICIPLE = (
+    (("ем", "нн", "вш", "ющ", "щ"), True),
+    (("ивш", "ывш", "ующ"), False),
+)
+VERB = (
+    (("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но",
+      "ет", "ют", "ны", "ть", "ешь", "нно"), True),
+    (("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей",
+      "уй", "ил", "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует",
+      "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"), False),
+)
+NOUN = ((
+    ("а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии",
+     "и", "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам",
+     "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия",
+     "ья", "я"),
+    False,
+),)
+DERIVATIONAL = ((("ост", "ость"), False),)
+SUPERLATIVE = ((("ейш", "ейше"), False),)
+
+
+def _regions(word):
+    """Начала областей RV и R2 (индексы в слове)."""
+    rv = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS), len(word))
+
+    def after_consonant(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    return rv, after_consonant(after_consonant(0))
+
+
+def _remove(word, start, groups):
+    """
+    Отрезать самое длинное окончание из групп, лежащее в области с
+    индекса ``start``. Окончания первой группы должны идти после «а»
+    или «я». Возвращает None, если отрезать нечего.
+    """
+    found, after_a = "", False
+    for endings, needs_a in groups:
+        for ending in endings:
+            if (len(ending) > len(found) and word.endswith(ending)
+                    and len(word) - len(ending) >= start):
+                found, after_a = ending, needs_a
+    if not found:
+        return None
+    cut = len(word) - len(found)
+    if after_a and (cut - 1 < start or word[cut - 1] not in "ая"):
+        return None
+    return word[:cut]
+
+
+def stem(word):
+    word = word.lower().replace("ё", "е")
+    rv, r2 = _regions(word)
+
+    # Шаг 1: деепричастие или возвратность + прилагательное/глагол/сущ.
+    stemmed = _remove(word, rv, PERFECTIVE_GERUND)
+    if stemmed is None:
+        stemmed = _remove(word, rv, REFLEXIVE) or word
+        adjective = _remove(stemmed, rv, ADJECTIVE)
+        if adjective is not None:
+            stemmed = _remove(adjective, rv, PARTICIPLE) or adjective
+        else:
+            stemmed = (
+                _remove(stemmed, rv, VERB)
+                or _remove(stemmed, rv, NOUN)
+                or stemmed
+            )
+    # Шаг 2.
+    if stemmed.endswith("и") and len(stemmed) - 1 >= rv:
+        stemmed = stemmed[:-1]
+    # Шаг 3: словообразовательные окончания в R2.
+    stemmed = _remove(stemmed, r2, DERIVATIONAL) or stemmed
+    # Шаг 4.
+    superlative = _remove(stemmed, rv, SUPERLATIVE)
+    if superlative is not None:
+        stemmed = superlative
+    if stemmed.endswith("нн") and len(stemmed) - 2 >= rv:
+        stemmed = stemmed[:-1]
+    elif superlative is None and stemmed.endswith("ь") and (
+            len(stemmed) - 1 >= rv):
+        stemmed = stemmed[:-1]
+    return stemmed
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .settings import IMAGE_HASH_ALGORITHM
+
+
+def _umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Права, с которыми FileSystemStorage создаёт файлы без
+# FILE_UPLOAD_PERMISSIONS.
+DEFAULT_MODE = 0o666 & ~_umask()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, где путь файла — хеш содержимого:
+    ``<каталог upload_to>/ab/cd/abcd…<расширение>``. Хеш считается
+    при потоковой записи во временный файл; одинаковые загрузки
+    становятся одним файлом, а ссылки на него считает ``StoredImage``.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Окончательное имя зависит от содержимого и выбирается в _save.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        digest = hashlib.new(IMAGE_HASH_ALGORITHM)
+        size = 0
+        with tempfile.NamedTemporaryFile(
+                dir=full_directory, prefix=".upload-", delete=False) as temp:
+            try:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                os.unlink(temp.name)
+                raise
+        hexdigest = digest.hexdigest()
+        name = "/".join(filter(None, (
+            directory, hexdigest[:2], hexdigest[2:4], hexdigest + extension)))
+        path = self.path(name)
+        # Строка учёта блокируется до проверки файла: сборщик удаляет
+        # строку и файл в одной транзакции, поэтому файл либо ещё
+        # есть и уже не будет удалён, либо его уже нет и он пишется
+        # заново.
+        with transaction.atomic():
+            touch(name, size)
+            if os.path.exists(path):
+                os.unlink(temp.name)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp.name, path)
+                # Временный файл создаётся с правами 0600, а остальные
+                # загрузки — с 0666 за вычетом umask.
+                mode = self.file_permissions_mode
+                os.chmod(path, DEFAULT_MODE if mode is None else mode)
+        return name
+
+
+def touch(name, size):
+    """Отметить загрузку файла: сборщик не тронет его в течение паузы."""
+    from .models import StoredImage
+    if StoredImage.objects.filter(name=name).update(touched=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            StoredImage.objects.create(name=name, size=size)
+    except IntegrityError:
+        pass
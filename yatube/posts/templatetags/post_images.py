@@ -0,0 +1,44 @@
+from django import template
+from django.templatetags.static import static
+
+from posts import thumbnails
+from posts.settings import (
+    IMAGE_FALLBACK, IMAGE_SIZES, THUMBNAIL_PLACEHOLDER
+)
+
+register = template.Library()
+
+
+def srcset(variants):
+    return ", ".join(
+        f"{thumbnail.url} {width}w" for width, thumbnail in variants)
+
+
+@register.inclusion_tag("posts/includes/post_image.html")
+def post_picture(post):
+    """
+    ``<picture>`` с готовыми вариантами картинки поста. Недостающие
+    варианты ставятся в очередь; пока нет запасного JPEG, выводится
+    заглушка.
+    """
+    if not post.image:
+        return {}
+    ready, missing = getattr(post, "ready_thumbnails", None) or (
+        thumbnails.ready(post.image.name))
+    if missing:
+        thumbnails.enqueue(post)
+    width, fallback_format = IMAGE_FALLBACK
+    fallback = dict(ready.get(fallback_format, [])).get(width)
+    if fallback is None:
+        return {"placeholder": static(THUMBNAIL_PLACEHOLDER)}
+    return {
+        "sources": [
+            {"type": thumbnails.MIME_TYPES[image_format],
+             "srcset": srcset(variants)}
+            for image_format, variants in ready.items()
+            if image_format != fallback_format
+        ],
+        "fallback": fallback,
+        "srcset": srcset(ready[fallback_format]),
+        "sizes": IMAGE_SIZES,
+    }
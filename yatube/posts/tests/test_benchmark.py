@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Follow, Group, Post, StoredImage, User
+from posts.urls import urlpatterns
+
+USERS = 12
+GROUPS = 2
+POSTS = 40
+COMMENTS = 30
+SHARED_KEY = 'thumbnail-queued:benchmark'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_benchmark', users=USERS, groups=GROUPS, posts=POSTS,
+            comments=COMMENTS, follows=3, images=1, stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_benchmark(self):
+        '''seed_benchmark создаёт данные и досчитывает счётчики.'''
+        self.assertEqual(User.objects.count(), USERS)
+        self.assertEqual(Group.objects.count(), GROUPS)
+        self.assertEqual(Post.objects.count(), POSTS)
+        self.assertEqual(Comment.objects.count(), COMMENTS)
+        self.assertTrue(Follow.objects.exists())
+        author = User.objects.filter(posts__isnull=False).first()
+        self.assertEqual(author.stats.posts_count, author.posts.count())
+
+    def test_seed_benchmark_counts_image_refs(self):
+        '''Картинки постов учтены в StoredImage.'''
+        used = Post.objects.exclude(image='')
+        self.assertTrue(used.exists())
+        for stored in StoredImage.objects.all():
+            with self.subTest(name=stored.name):
+                self.assertEqual(
+                    stored.refs, used.filter(image=stored.name).count())
+        self.assertEqual(
+            StoredImage.objects.count(),
+            used.values('image').distinct().count())
+
+    def test_cold_run_keeps_shared_cache(self):
+        '''--cold сбрасывает ленты, не очищая общий кэш целиком.'''
+        cache.set(SHARED_KEY, True)
+        call_command(
+            'benchmark_views', repeat=1, cold=True, stdout=StringIO())
+        self.assertTrue(cache.get(SHARED_KEY))
+
+    def test_benchmark_views_covers_all_urls(self):
+        '''benchmark_views замеряет каждый адрес posts.urls.'''
+        output = os.path.join(TEMP_MEDIA_ROOT, 'bench.json')
+        call_command(
+            'benchmark_views', repeat=1, output=output, stdout=StringIO())
+        with open(output) as results:
+            results = json.load(results)
+        self.assertEqual(
+            set(results), {pattern.name for pattern in urlpatterns})
+        for name in ('post_create', 'post_edit', 'add_comment'):
+            with self.subTest(name=name):
+                self.assertEqual(results[name]['method'], 'POST')
+        self.assertEqual(Post.objects.count(), POSTS)
+        self.assertEqual(Comment.objects.count(), COMMENTS)
+        for name, row in results.items():
+            with self.subTest(name=name):
+                self.assertGreaterEqual(row['p95_ms'], row['p50_ms'])
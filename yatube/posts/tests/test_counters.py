@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+AUTHOR = 'author'
+FOLLOWER = 'follower'
+POST_TEXT = 'Тестовый текст поста'
+COMMENT_TEXT = 'Тестовый комментарий'
+COMMENTS = 31
+# Комментарии, авторы (UPDATE на каждого из двух), записи лент, пост,
+# поисковый индекс и счётчик постов — сколько бы ни было комментариев.
+POST_DELETE_QUERIES = 9
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_signals_keep_counters(self):
+        '''Счётчики обновляются при создании и удалении объектов.'''
+        post = Post.objects.create(author=self.author, text=POST_TEXT)
+        comment = Comment.objects.create(
+            post=post, author=self.follower, text=COMMENT_TEXT)
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.follower).following_count, 1)
+        self.assertEqual(self.stats(self.follower).comments_count, 1)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        for user in [self.author, self.follower]:
+            with self.subTest(user=user):
+                stats = self.stats(user)
+                self.assertEqual(
+                    [stats.posts_count, stats.comments_count,
+                     stats.followers_count, stats.following_count],
+                    [0, 0, 0, 0]
+                )
+
+    def test_post_delete_query_budget(self):
+        '''Удаление поста не делает запросов на каждый комментарий.'''
+        post = Post.objects.create(author=self.author, text=POST_TEXT)
+        for number in range(COMMENTS):
+            Comment.objects.create(
+                post=post, author=[self.author, self.follower][number % 2],
+                text=COMMENT_TEXT)
+        with self.assertNumQueries(POST_DELETE_QUERIES):
+            post.delete()
+        for user in [self.author, self.follower]:
+            with self.subTest(user=user):
+                self.assertEqual(self.stats(user).comments_count, 0)
+
+    def test_user_delete_keeps_counters(self):
+        '''Удаление пользователя уменьшает счётчики чужих постов.'''
+        reader = User.objects.create_user(username='reader')
+        post = Post.objects.create(author=self.author, text=POST_TEXT)
+        own_post = Post.objects.create(author=reader, text=POST_TEXT)
+        for target in [post, post, own_post]:
+            Comment.objects.create(
+                post=target, author=reader, text=COMMENT_TEXT)
+        Comment.objects.create(
+            post=own_post, author=self.follower, text=COMMENT_TEXT)
+        reader.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual(self.stats(self.follower).comments_count, 0)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_reconcile_counters_fixes_drift(self):
+        '''Команда reconcile_counters исправляет расхождения.'''
+        post = Post.objects.create(author=self.author, text=POST_TEXT)
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.follower, text=COMMENT_TEXT)
+        ])
+        UserStats.objects.filter(user=self.author).update(posts_count=10)
+        UserStats.objects.filter(user=self.follower).delete()
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.follower).comments_count, 1)
@@ -0,0 +1,146 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.feeds import follow_feed, follow_paginator
+from posts.models import FeedEntry, Follow, Post, User
+
+AUTHOR = 'author'
+FOLLOWER = 'follower'
+READER = 'reader'
+POST_TEXT = 'Тестовый текст поста'
+FOLLOW_INDEX = reverse('posts:follow_index')
+
+
+def run_now(callback):
+    callback()
+
+
+@mock.patch('posts.feeds.FEED_WORKERS', 0)
+@mock.patch('posts.feeds.transaction.on_commit', run_now)
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.reader = User.objects.create_user(username=READER)
+        cls.old_post = Post.objects.create(author=cls.author, text=POST_TEXT)
+        cls.follower_client = Client()
+        cls.follower_client.force_login(cls.follower)
+
+    def feed(self):
+        return list(
+            self.follower_client.get(FOLLOW_INDEX).context['page_obj'])
+
+    def test_follow_backfills_and_post_fans_out(self):
+        '''Подписка добавляет старые посты, новый пост попадает в ленту.'''
+        Follow.objects.create(user=self.follower, author=self.author)
+        new_post = Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=self.follower).values_list(
+                'post', flat=True)),
+            {self.old_post.pk, new_post.pk}
+        )
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_removes_entries(self):
+        '''Отписка очищает ленту от постов автора.'''
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.follower))
+        self.assertEqual(self.feed(), [])
+
+    @mock.patch('posts.feeds.FANOUT_MAX_FOLLOWERS', 0)
+    def test_large_author_read_on_the_fly(self):
+        '''Посты автора без раскладки подмешиваются при чтении.'''
+        Follow.objects.create(user=self.follower, author=self.author)
+        new_post = Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertFalse(FeedEntry.objects.filter(user=self.follower))
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_rebuild_feeds_command(self):
+        '''Команда rebuild_feeds восстанавливает ленту.'''
+        Follow.objects.create(user=self.follower, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', FOLLOWER, stdout=mock.Mock())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_entry_copies_post_key(self):
+        '''Запись ленты хранит автора и дату поста.'''
+        Follow.objects.create(user=self.follower, author=self.author)
+        entry = FeedEntry.objects.get(user=self.follower)
+        self.assertEqual(entry.author, self.author)
+        self.assertEqual(entry.pub_date, self.old_post.pub_date)
+
+    @mock.patch('posts.feeds.FANOUT_MAX_FOLLOWERS', 1)
+    @mock.patch('posts.feeds.FANOUT_RESUME_FOLLOWERS', 1)
+    def test_threshold_crossing(self):
+        '''Переход порога убирает записи автора, возврат — раскладывает.'''
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(author=self.author))
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(author=self.author))
+        self.assertEqual(self.feed(), [self.old_post])
+        follow.delete()
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post')),
+            [(self.follower.pk, self.old_post.pk)])
+
+    @mock.patch('posts.feeds.FANOUT_MAX_FOLLOWERS', 1)
+    @mock.patch('posts.feeds.FANOUT_RESUME_FOLLOWERS', 0)
+    def test_threshold_hysteresis(self):
+        '''Автор между порогами остаётся без раскладки.'''
+        Follow.objects.create(user=self.follower, author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(author=self.author))
+        self.assertEqual(self.feed(), [self.old_post])
+
+    @mock.patch('posts.feeds.FANOUT_MAX_FOLLOWERS', 1)
+    def test_crossing_waits_for_commit(self):
+        '''Записи автора убираются только после фиксации транзакции.'''
+        Follow.objects.create(user=self.follower, author=self.author)
+        with mock.patch('posts.feeds.transaction.on_commit') as commit:
+            Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(author=self.author))
+        commit.assert_called_once()
+        commit.call_args[0][0]()
+        self.assertFalse(FeedEntry.objects.filter(author=self.author))
+
+    @mock.patch('posts.feeds.FEED_BACKFILL_POSTS', 2)
+    def test_backfill_copies_recent_posts(self):
+        '''Подписка копирует в ленту только последние посты автора.'''
+        posts = [
+            Post.objects.create(author=self.author, text=POST_TEXT)
+            for _ in range(3)
+        ]
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('post', flat=True)),
+            {posts[-1].pk, posts[-2].pk})
+
+    @mock.patch('posts.feeds.FANOUT_MAX_FOLLOWERS', 1)
+    def test_merged_feed_pages(self):
+        '''Лента из записей и постов без раскладки идёт по дате.'''
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.follower, author=self.reader)
+        posts = [self.old_post]
+        for number in range(4):
+            author = self.reader if number % 2 else self.author
+            posts.append(Post.objects.create(author=author, text=POST_TEXT))
+        paginator = follow_paginator(
+            [posts.feed() for posts in follow_feed(self.follower)], 2)
+        page = paginator.get_page()
+        shown = list(page)
+        while paginator.next_cursor:
+            cursor = paginator.next_cursor
+            paginator = follow_paginator(
+                [posts.feed() for posts in follow_feed(self.follower)], 2)
+            page = paginator.get_page(cursor=cursor)
+            shown.extend(page)
+        self.assertEqual(shown, posts[::-1])
+        self.assertTrue(page.has_previous())
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -7,6 +8,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, override_settings, TestCase
 from django.urls import reverse
 
+from core.testing import QueryBudgetMixin
 from posts.models import Post, Group, User, Comment
 
 USERNAME_NOT_AUTHOR = 'NotAuthor'
@@ -47,12 +49,14 @@ UPLOADED_IMAGE3 = SimpleUploadedFile(
     content=SMALL_IMAGE,
     content_type='image/gif'
 )
+DIGEST = hashlib.sha256(SMALL_IMAGE).hexdigest()
+IMAGE_NAME = f'posts/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.gif'
 UNEDITED_TEXT = 'Нередактируемый пост'
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
-class PostFormTest(TestCase):
+class PostFormTest(QueryBudgetMixin, TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -115,10 +119,7 @@ class PostFormTest(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.pk, form_data['group'])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(
-            post.image.name.split('/')[-1],
-            form_data['image'].name
-        )
+        self.assertEqual(post.image.name, IMAGE_NAME)
 
     def test_guest_can_not_create_post(self):
         '''
@@ -161,10 +162,7 @@ class PostFormTest(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.pk, form_data['group'])
         self.assertEqual(post.author, self.post.author)
-        self.assertEqual(
-            post.image.name.split('/')[-1],
-            form_data['image'].name
-        )
+        self.assertEqual(post.image.name, IMAGE_NAME)
 
     def test_guest_and_another_can_not_edit_post(self):
         '''
@@ -1,6 +1,7 @@
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-from posts.models import Group, Post, User
+from posts.models import Follow, Group, Post, User
 
 
 GROUP_TITLE = 'Тестовая группа'
@@ -8,6 +9,8 @@ GROUP_SLUG = 'Тестовый слаг'
 GROUP_DESCRIPTION = 'Тестовое описание'
 USERNAME = 'auth'
 POST_TEXT = 'Тестовый текст поста'
+FOLLOWER = 'follower'
+AUTHOR = 'author'
 
 
 class PostModelTests(TestCase):
@@ -34,3 +37,55 @@ class PostModelTests(TestCase):
         for model, expected_value in str_expected_value.items():
             with self.subTest(model=model):
                 self.assertEqual(str(model), expected_value)
+
+
+class FollowLookupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.author = User.objects.create_user(username=AUTHOR)
+        cls.stranger = User.objects.create_user(username=USERNAME)
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def test_is_following(self):
+        """Проверка подписки на одного автора."""
+        self.assertTrue(
+            Follow.objects.is_following(self.follower, self.author))
+        self.assertFalse(
+            Follow.objects.is_following(self.author, self.follower))
+
+    def test_following_ids(self):
+        """Проверка подписок на нескольких авторов одним запросом."""
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                Follow.objects.following_ids(
+                    self.follower, [self.author, self.stranger]),
+                {self.author.pk}
+            )
+
+    def test_mutual(self):
+        """Взаимные подписки."""
+        self.assertFalse(Follow.objects.mutual(self.follower))
+        Follow.objects.create(user=self.author, author=self.follower)
+        self.assertEqual(
+            list(Follow.objects.mutual(self.follower)), [self.author])
+
+    def test_follow_is_idempotent(self):
+        """Повторная подписка и подписка на себя не создают записей."""
+        self.assertTrue(Follow.objects.follow(self.stranger, self.author))
+        self.assertFalse(Follow.objects.follow(self.stranger, self.author))
+        self.assertFalse(Follow.objects.follow(self.stranger, self.stranger))
+        self.assertEqual(Follow.objects.filter(user=self.stranger).count(), 1)
+
+    def test_follow_constraints(self):
+        """Ограничения БД запрещают дубли и подписку на себя."""
+        follows = [
+            [self.follower, self.author],
+            [self.author, self.author],
+        ]
+        for user, author in follows:
+            with self.subTest(user=user, author=author):
+                with self.assertRaises(IntegrityError):
+                    with transaction.atomic():
+                        Follow.objects.create(user=user, author=author)
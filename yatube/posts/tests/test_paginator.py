@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.paginator import CursorPaginator
+from posts.settings import POST_PER_PAGE
+
+USERNAME = 'user'
+POST_TEXT = 'Тестовый текст поста {}'
+POST_COUNT = POST_PER_PAGE * 2 + 3
+INDEX = reverse('posts:index')
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=POST_TEXT.format(i))
+            for i in range(POST_COUNT)
+        )
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def paginate(self, **kwargs):
+        return CursorPaginator(Post.objects.all(), POST_PER_PAGE).get_page(
+            **kwargs)
+
+    def test_cursor_walks_all_posts(self):
+        '''Курсоры next/prev обходят все посты без повторов.'''
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        page = self.paginate()
+        seen = list(page)
+        while page.has_next():
+            page = self.paginate(cursor=page.paginator.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, expected)
+        self.assertEqual(page.number, 3)
+        previous = self.paginate(cursor=page.paginator.previous_cursor)
+        self.assertEqual(previous.number, 2)
+        self.assertEqual(
+            list(previous), expected[POST_PER_PAGE:POST_PER_PAGE * 2])
+
+    def test_next_page_stable_after_insert(self):
+        '''Новый пост не сдвигает следующую страницу.'''
+        first = self.paginate()
+        expected = list(self.paginate(cursor=first.paginator.next_cursor))
+        Post.objects.create(author=self.user, text=POST_TEXT.format('new'))
+        second = self.paginate(cursor=first.paginator.next_cursor)
+        self.assertEqual(list(second), expected)
+
+    def test_page_without_count_query(self):
+        '''Страница загружается одним запросом, без COUNT.'''
+        cursor = self.paginate().paginator.next_cursor
+        with self.assertNumQueries(1):
+            page = self.paginate(cursor=cursor)
+            self.assertTrue(page.has_next())
+            self.assertTrue(page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        '''Некорректный курсор возвращает первую страницу.'''
+        for cursor in ['garbage', 'W10', '!!!']:
+            with self.subTest(cursor=cursor):
+                response = self.guest.get(INDEX, {'cursor': cursor})
+                self.assertEqual(response.context['page_obj'].number, 1)
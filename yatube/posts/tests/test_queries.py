@@ -0,0 +1,72 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+USERNAME = 'user'
+FOLLOWER = 'follower'
+GROUP_SLUG = 'test-slug'
+POST_TEXT = 'Тестовый текст поста {}'
+POST_COUNT = 30
+PAGE_SIZES = [1, 5, 25]
+
+INDEX = reverse('posts:index')
+GROUP_LIST = reverse('posts:group_list', args=[GROUP_SLUG])
+PROFILE = reverse('posts:profile', args=[USERNAME])
+FOLLOW_INDEX = reverse('posts:follow_index')
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username=USERNAME, first_name='Имя', last_name='Фамилия')
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=GROUP_SLUG, description='Описание')
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        for i in range(POST_COUNT):
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=POST_TEXT.format(i))
+        cls.guest = Client()
+        cls.follower_client = Client()
+        cls.follower_client.force_login(cls.follower)
+
+    def count_queries(self, client, url, per_page):
+        cache.clear()
+        with mock.patch('posts.views.POST_PER_PAGE', per_page):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+        self.assertEqual(len(response.context['page_obj']), per_page)
+        return len(queries)
+
+    def test_feed_query_budget(self):
+        '''Число запросов ленты не зависит от размера страницы.'''
+        budgets = [
+            [INDEX, self.guest, 1],
+            [GROUP_LIST, self.guest, 3],
+            [PROFILE, self.guest, 3],
+            [FOLLOW_INDEX, self.follower_client, 4],
+        ]
+        for url, client, budget in budgets:
+            for per_page in PAGE_SIZES:
+                with self.subTest(url=url, per_page=per_page):
+                    self.assertEqual(
+                        self.count_queries(client, url, per_page), budget)
+
+    def test_explain_feeds(self):
+        '''Команда explain_feeds печатает планы всех лент.'''
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        for name in ['index', 'group_list', 'profile', 'follow_index']:
+            with self.subTest(name=name):
+                self.assertIn(f'{name}', out.getvalue())
+        self.assertIn('posts_post_author_date_idx', out.getvalue())
@@ -14,10 +14,12 @@ class RoutesTests(TestCase):
             ['/', 'index', []],
             [f'/group/{SLUG}/', 'group_list', [SLUG]],
             [f'/profile/{USERNAME}/', 'profile', [USERNAME]],
+            ['/search/', 'search', []],
             [f'/posts/{POST_PK}/', 'post_detail', [POST_PK]],
             [f'/posts/{POST_PK}/edit/', 'post_edit', [POST_PK]],
             ['/create/', 'post_create', []],
             [f'/posts/{POST_PK}/comment/', 'add_comment', [POST_PK]],
+            [f'/posts/{POST_PK}/comments/', 'comments', [POST_PK]],
             ['/follow/', 'follow_index', []],
             [f'/profile/{USERNAME}/follow/', 'profile_follow', [USERNAME]],
             [f'/profile/{USERNAME}/unfollow/', 'profile_unfollow', [USERNAME]]
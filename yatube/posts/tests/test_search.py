@@ -0,0 +1,136 @@
+from django.contrib.admin.sites import site
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core.testing import QueryBudgetMixin
+from posts import search
+from posts.models import Post, User
+from posts.stemmer import stem
+
+USERNAME = 'user'
+SEARCH = reverse('posts:search')
+TEXTS = [
+    'Красивая собака бегала по парку',
+    'Собаки и кошки живут дружно',
+    'Собака, собаку, собакой: о собаках',
+    'Про погоду и ничего больше',
+]
+STEMS = [
+    ['красивая', 'красив'],
+    ['собаками', 'собак'],
+    ['бегали', 'бега'],
+    ['важнейшие', 'важн'],
+    ['радостью', 'радост'],
+    ['одеваясь', 'одев'],
+    ['Ёлки', 'елк'],
+]
+
+
+class StemmerTests(TestCase):
+    def test_stem(self):
+        '''Стеммер отсекает окончания и заменяет ё на е.'''
+        for word, expected in STEMS:
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=text) for text in TEXTS
+        ]
+        cls.guest = Client()
+
+    def found(self, query):
+        return list(search.search(Post.objects.all(), query))
+
+    def test_word_forms_match(self):
+        '''Поиск находит посты по другим формам слова.'''
+        self.assertEqual(
+            {post.pk for post in self.found('собаками')},
+            {post.pk for post in self.posts[:3]})
+        self.assertEqual(self.found('погодой'), [self.posts[3]])
+
+    def test_all_words_required(self):
+        '''В найденных постах есть все слова запроса.'''
+        self.assertEqual(self.found('красивые собаки'), [self.posts[0]])
+        self.assertEqual(self.found('собака погода'), [])
+
+    def test_ranking(self):
+        '''Пост, где слово встречается чаще, идёт первым.'''
+        ranked = list(search.search(Post.objects.all(), 'собака').order_by(
+            *search.ORDERING))
+        self.assertEqual(ranked[0], self.posts[2])
+
+    def test_rank_read_with_match(self):
+        '''Ранг читается в том же запросе, что и MATCH.'''
+        sql = str(search.search(Post.objects.all(), 'собака').query)
+        self.assertEqual(sql.count('MATCH'), 1)
+
+    def test_index_follows_edits_and_deletes(self):
+        '''Индекс обновляется при правке и удалении поста.'''
+        post = Post.objects.create(author=self.user, text='Первый вариант')
+        self.assertEqual(self.found('вариант'), [post])
+        post.text = 'Исправленная запись'
+        post.save()
+        self.assertEqual(self.found('вариант'), [])
+        self.assertEqual(self.found('исправленные'), [post])
+        post.delete()
+        self.assertEqual(self.found('исправленные'), [])
+
+    def test_rebuild(self):
+        '''rebuild пересобирает индекс после правок в обход сигналов.'''
+        Post.objects.filter(pk=self.posts[3].pk).update(text='Новый текст')
+        search.rebuild(Post.objects.all())
+        self.assertEqual(self.found('погода'), [])
+        self.assertEqual(self.found('текста'), [self.posts[3]])
+
+    def test_syntax_is_not_interpreted(self):
+        '''Синтаксис FTS в запросе не приводит к ошибкам.'''
+        for query in ['"', 'AND', 'собака OR', '*', 'NEAR(', '']:
+            with self.subTest(query=query):
+                self.found(query)
+
+    def test_highlight(self):
+        '''Совпадения выделяются, а HTML текста экранируется.'''
+        snippet = search.highlight(
+            '<b>Собаки</b> и кошки', 'собака')
+        self.assertEqual(
+            snippet, '&lt;b&gt;<mark>Собаки</mark>&lt;/b&gt; и кошки')
+
+    def test_search_view(self):
+        '''Страница поиска выводит найденные посты с подсветкой.'''
+        response = self.guest.get(SEARCH, {'q': 'Собаки'})
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 3)
+        self.assertEqual(page[0], self.posts[2])
+        self.assertContains(response, '<mark>собакой</mark>')
+        self.assertIsNone(
+            self.guest.get(SEARCH).context['page_obj'])
+
+    def test_search_view_cursor(self):
+        '''Ссылки на страницы поиска сохраняют запрос и курсор.'''
+        for i in range(15):
+            Post.objects.create(author=self.user, text=f'Собака номер {i}')
+        response = self.guest.get(SEARCH, {'q': 'собака'})
+        first = response.context['page_obj']
+        cursor = first.paginator.next_cursor
+        self.assertContains(
+            response, f'?{urlencode({"q": "собака"})}&cursor={cursor}')
+        second = self.guest.get(
+            SEARCH, {'q': 'собака', 'cursor': cursor}).context['page_obj']
+        self.assertEqual(len(first) + len(second), 18)
+        self.assertFalse(set(first) & set(second))
+
+    def test_admin_search(self):
+        '''Поиск в админке использует полнотекстовый индекс.'''
+        request = RequestFactory().get('/')
+        queryset, use_distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'собакой')
+        self.assertEqual(
+            set(queryset), set(self.posts[:3]))
+        self.assertFalse(use_distinct)
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from posts import storage, thumbnails
+from posts.models import Post, StoredImage, User
+from posts.settings import IMAGE_FALLBACK as FALLBACK
+from posts.settings import IMAGE_GC_GRACE
+
+USERNAME = 'user'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def image_file(content, name='image.png'):
+    return SimpleUploadedFile(name, content, 'image/png')
+
+
+def run_now(callback):
+    callback()
+
+
+def expire(name):
+    StoredImage.objects.filter(name=name).update(
+        touched=timezone.now() - timedelta(seconds=IMAGE_GC_GRACE + 1))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails.THUMBNAIL_WORKERS', 0)
+@mock.patch('django.db.transaction.on_commit', run_now)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, content, name='image.png'):
+        return Post.objects.create(
+            author=self.user, text='Пост', image=image_file(content, name))
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name))
+
+    def test_name_is_content_hash(self):
+        """Имя файла — хэш содержимого, размер и ссылки учтены."""
+        content = image_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        post = self.create(content, 'Фото.PNG')
+        self.assertEqual(
+            post.image.name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.png')
+        self.assertTrue(self.exists(post.image.name))
+        stored = StoredImage.objects.get(name=post.image.name)
+        self.assertEqual(stored.size, len(content))
+        self.assertEqual(stored.refs, 1)
+
+    def test_file_mode(self):
+        """Файл читается всеми, как у FileSystemStorage без настроек."""
+        umask = os.umask(0)
+        os.umask(umask)
+        post = self.create(image_bytes('orange'))
+        mode = os.stat(os.path.join(TEMP_MEDIA_ROOT, post.image.name)).st_mode
+        self.assertEqual(mode & 0o777, 0o666 & ~umask)
+        with override_settings(FILE_UPLOAD_PERMISSIONS=0o640):
+            post = self.create(image_bytes('navy'))
+        mode = os.stat(os.path.join(TEMP_MEDIA_ROOT, post.image.name)).st_mode
+        self.assertEqual(mode & 0o777, 0o640)
+
+    def test_file_removed_by_collector_is_written_again(self):
+        """Файл, удалённый сборщиком до проверки, пишется заново."""
+        content = image_bytes('maroon')
+        name = self.create(content).image.name
+        touch = storage.touch
+
+        def collected(*args):
+            touch(*args)
+            os.unlink(os.path.join(TEMP_MEDIA_ROOT, name))
+
+        with mock.patch('posts.storage.touch', collected):
+            post = self.create(content)
+        self.assertEqual(post.image.name, name)
+        self.assertTrue(self.exists(name))
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки ссылаются на один файл."""
+        content = image_bytes('blue')
+        first = self.create(content, 'first.png')
+        second = self.create(content, 'second.png')
+        self.assertEqual(first.image.name, second.image.name)
+        directory = os.path.dirname(
+            os.path.join(TEMP_MEDIA_ROOT, first.image.name))
+        self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(
+            StoredImage.objects.get(name=first.image.name).refs, 2)
+
+    def test_shared_file_survives_until_last_reference(self):
+        """Общий файл удаляется вместе с последней ссылкой."""
+        first = self.create(image_bytes('green'))
+        second = self.create(image_bytes('green'))
+        name = first.image.name
+        expire(name)
+        first.delete()
+        self.assertTrue(self.exists(name))
+        second.delete()
+        self.assertFalse(self.exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+
+    def test_edit_collects_old_file_and_thumbnails(self):
+        """Замена картинки удаляет старый файл и его миниатюры."""
+        post = self.create(image_bytes('yellow'))
+        old = post.image.name
+        thumbnail = thumbnails.cached(old, FALLBACK)
+        self.assertIsNotNone(thumbnail)
+        expire(old)
+        post.image = image_file(image_bytes('black'))
+        post.save()
+        self.assertFalse(self.exists(old))
+        self.assertFalse(self.exists(thumbnail.name))
+        self.assertIsNone(thumbnails.cached(old, FALLBACK))
+        self.assertEqual(StoredImage.objects.get(name=post.image.name).refs, 1)
+
+    def test_recent_upload_is_kept(self):
+        """Файл моложе IMAGE_GC_GRACE не удаляется."""
+        post = self.create(image_bytes('white'))
+        name = post.image.name
+        post.delete()
+        self.assertTrue(self.exists(name))
+        self.assertEqual(StoredImage.objects.get(name=name).refs, 0)
+
+    def test_collect_command(self):
+        """collect_images удаляет файлы без ссылок и брошенные загрузки."""
+        post = self.create(image_bytes('purple'))
+        name = post.image.name
+        Post.objects.filter(pk=post.pk).update(image='')
+        stray = os.path.join(TEMP_MEDIA_ROOT, 'posts', '.upload-stray')
+        with open(stray, 'wb') as file:
+            file.write(b'stray')
+        call_command(
+            'collect_images', '--grace=0', '--scan', stdout=StringIO())
+        self.assertFalse(self.exists(name))
+        self.assertFalse(os.path.exists(stray))
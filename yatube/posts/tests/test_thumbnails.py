@@ -0,0 +1,249 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+import sorl
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.testing import QueryRecorder
+from posts import caching, thumbnails
+from posts.models import Post, User
+from posts.settings import IMAGE_FALLBACK as FALLBACK
+from posts.settings import IMAGE_WIDTHS, THUMBNAIL_GEOMETRIES
+
+USERNAME = 'user'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+INDEX = reverse('posts:index')
+
+
+def image_file(name='image.png', color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+def run_now(callback):
+    callback()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails.THUMBNAIL_WORKERS', 0)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.guest = Client()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_saving_post_enqueues_after_commit(self):
+        '''Миниатюры ставятся в очередь после фиксации транзакции.'''
+        with mock.patch('posts.thumbnails.transaction.on_commit') as commit:
+            post = Post.objects.create(
+                author=self.user, text='Пост', image=image_file())
+            self.assertEqual(commit.call_count, 1)
+            self.assertIsNone(thumbnails.cached(post.image.name, FALLBACK))
+            commit.call_args[0][0]()
+        self.assertIsNotNone(thumbnails.cached(post.image.name, FALLBACK))
+
+    def test_text_edit_does_not_enqueue(self):
+        '''Правка текста не ставит картинку в очередь снова.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        post = Post.objects.get(pk=post.pk)
+        with mock.patch('posts.thumbnails.enqueue') as enqueue:
+            post.text = 'Новый текст'
+            post.save()
+        enqueue.assert_not_called()
+
+    def test_template_shows_placeholder_until_ready(self):
+        '''Пока миниатюры не готовы, выводится заглушка.'''
+        Post.objects.create(author=self.user, text='Пост', image=image_file())
+        with mock.patch('posts.thumbnails.transaction.on_commit', run_now):
+            first = self.guest.get(INDEX)
+            self.assertContains(first, 'img/placeholder.svg')
+            second = self.guest.get(INDEX)
+        self.assertNotContains(second, 'img/placeholder.svg')
+        self.assertContains(second, f'{settings.MEDIA_URL}cache/')
+
+    def test_generation_expires_feeds(self):
+        '''Готовые миниатюры сбрасывают ленты с заглушкой.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        before = caching.versions(caching.index_scope())
+        thumbnails.generate(post.image.name, thumbnails.feed_scopes(post))
+        self.assertNotEqual(caching.versions(caching.index_scope()), before)
+
+    def test_worker_errors_are_logged(self):
+        '''Ошибка нарезки пишется в лог, повтор — после задержки.'''
+        with mock.patch('posts.thumbnails.get_thumbnail',
+                        side_effect=OSError) as get:
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                thumbnails.submit('posts/broken.png')
+            calls = get.call_count
+            thumbnails.submit('posts/broken.png')
+            self.assertEqual(get.call_count, calls)
+            cache.delete(thumbnails.QUEUED_KEY.format('posts/broken.png'))
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                thumbnails.submit('posts/broken.png')
+        self.assertEqual(get.call_count, 2 * calls)
+
+    def test_sorl_name_matches_get_thumbnail(self):
+        '''sorl_name совпадает с именем, которое даёт sorl.'''
+        self.assertEqual(sorl.__version__, thumbnails.SORL_VERSION)
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        geometry, options = THUMBNAIL_GEOMETRIES[FALLBACK]
+        self.assertEqual(
+            thumbnails.sorl_name(
+                ImageFile(post.image.name), geometry, options),
+            get_thumbnail(post.image.name, geometry, **options).name)
+
+    def test_warm_thumbnails(self):
+        '''warm_thumbnails нарезает все и только недостающие миниатюры.'''
+        posts = [
+            Post.objects.create(
+                author=self.user, text='Пост',
+                image=image_file(f'{i}.png', color))
+            for i, color in enumerate(('red', 'green', 'blue'))
+        ]
+        out = StringIO()
+        call_command('warm_thumbnails', '--workers', '0', stdout=out)
+        self.assertIn('3', out.getvalue())
+        for post in posts:
+            self.assertIsNotNone(thumbnails.cached(post.image.name, FALLBACK))
+        out = StringIO()
+        call_command(
+            'warm_thumbnails', '--workers', '0', '--missing', stdout=out)
+        self.assertIn('0', out.getvalue())
+
+    def test_unsupported_formats_skipped(self):
+        '''Форматы без поддержки в Pillow пропускаются.'''
+        self.assertNotIn('AVIF', {fmt for width, fmt in thumbnails.variants()})
+        self.assertIn(FALLBACK, thumbnails.variants())
+
+    def test_picture_srcset(self):
+        '''Лента выводит <picture> с srcset всех ширин.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        thumbnails.generate(post.image.name)
+        response = self.guest.get(INDEX)
+        self.assertContains(response, '<picture>')
+        for width in IMAGE_WIDTHS:
+            self.assertContains(response, f' {width}w')
+
+    def test_picture_sources(self):
+        '''<source> идут по форматам, img — крупный JPEG.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+
+        def fake(width, image_format):
+            return width, SimpleNamespace(
+                url=f'/{width}.{image_format}', width=width, height=1)
+
+        ready = {
+            'WEBP': [fake(480, 'webp'), fake(960, 'webp')],
+            'JPEG': [fake(480, 'jpg'), fake(960, 'jpg')],
+        }
+        with mock.patch('posts.thumbnails.ready', return_value=(ready, False)):
+            response = self.guest.get(
+                reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(
+            response,
+            '<source type="image/webp" srcset="/480.webp 480w, '
+            '/960.webp 960w"')
+        self.assertContains(response, 'src="/960.jpg"')
+
+    def test_image_report(self):
+        '''image_report считает картинки и готовые варианты.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        thumbnails.generate(post.image.name)
+        out = StringIO()
+        call_command('image_report', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['images'], 1)
+        self.assertEqual(
+            set(report['variants']),
+            {f'{width}w {fmt}' for width, fmt in thumbnails.variants()})
+        out = StringIO()
+        call_command('image_report', stdout=out)
+        self.assertIn('960w JPEG', out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails.THUMBNAIL_WORKERS', 0)
+class ThumbnailStoreTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.guest = Client()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_store_lives_in_cache(self):
+        '''Записи sorl-thumbnail хранятся в кэше, а не в БД.'''
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file())
+        thumbnails.generate(post.image.name)
+        self.assertFalse(KVStoreModel.objects.exists())
+        self.assertIsNotNone(thumbnails.cached(post.image.name, FALLBACK))
+
+    def test_thumbnail_cleanup_fails_loudly(self):
+        '''thumbnail cleanup и clear отсылают к collect_images.'''
+        for label in ('cleanup', 'clear'):
+            with self.subTest(label=label):
+                with self.assertRaisesMessage(CommandError, 'collect_images'):
+                    call_command('thumbnail', label, verbosity=0)
+
+    def test_shared_cache_holds_thumbnail_records(self):
+        '''Общий кэш вмещает записи миниатюр и живёт их срок.'''
+        shared = settings.CACHES['shared']
+        records = len(THUMBNAIL_GEOMETRIES) + 2
+        self.assertGreaterEqual(
+            shared['OPTIONS']['MAX_ENTRIES'], 1000 * records)
+        self.assertEqual(shared['TIMEOUT'], settings.THUMBNAIL_CACHE_TIMEOUT)
+
+    def test_page_resolves_thumbnails_in_one_lookup(self):
+        '''Миниатюры страницы читаются одним get_many.'''
+        for color in ('red', 'green', 'blue'):
+            post = Post.objects.create(
+                author=self.user, text='Пост',
+                image=image_file(f'{color}.png', color))
+            thumbnails.generate(post.image.name)
+        kvstore = thumbnails.default.kvstore
+        with mock.patch.object(
+                kvstore, 'get_many', wraps=kvstore.get_many) as get_many:
+            with mock.patch.object(kvstore, 'get') as get:
+                with QueryRecorder() as recorder:
+                    response = self.guest.get(INDEX)
+        self.assertEqual(get_many.call_count, 1)
+        get.assert_not_called()
+        self.assertEqual(recorder.violations(), [])
+        self.assertNotContains(response, 'img/placeholder.svg')
@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post, User
+
+USERNAME = 'user'
+POST_TEXT = 'Пост с картинкой'
+CREATE = reverse('posts:post_create')
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+ROTATED = 6
+
+
+def image_file(size=(40, 20), image_format='PNG', name='image.png',
+               mode='RGB', **params):
+    buffer = BytesIO()
+    Image.new(mode, size).save(buffer, image_format, **params)
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), f'image/{image_format.lower()}')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails.THUMBNAIL_WORKERS', 0)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, image, client=None):
+        return (client or self.author_client).post(
+            CREATE, {'text': POST_TEXT, 'image': image})
+
+    def assertRejected(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.filter(text=POST_TEXT).exists())
+
+    @mock.patch('posts.uploads.IMAGE_MAX_BYTES', 10)
+    def test_too_many_bytes(self):
+        '''Файл больше IMAGE_MAX_BYTES отклоняется.'''
+        self.assertRejected(self.upload(image_file()))
+
+    @mock.patch('posts.uploads.IMAGE_MAX_PIXELS', 1000)
+    def test_too_many_pixels(self):
+        '''Картинка больше IMAGE_MAX_PIXELS отклоняется по заголовку.'''
+        image = image_file((3000, 3000), mode='1')
+        with mock.patch.object(Image.Image, 'load') as load:
+            response = self.upload(image)
+        self.assertRejected(response)
+        load.assert_not_called()
+
+    @mock.patch('posts.uploads.IMAGE_HEADER_BYTES', 8)
+    @mock.patch('posts.uploads.IMAGE_MAX_PIXELS', 1000)
+    def test_too_many_pixels_without_header(self):
+        '''Размеры за пределами заголовка проверяются без декодирования.'''
+        image = image_file((3000, 3000), mode='1')
+        with mock.patch.object(Image.Image, 'load') as load:
+            response = self.upload(image)
+        self.assertRejected(response)
+        load.assert_not_called()
+
+    def test_clean_image_is_stored_as_is(self):
+        '''Картинка без EXIF сохраняется без перекодирования.'''
+        image = image_file()
+        self.upload(image)
+        post = Post.objects.get(text=POST_TEXT)
+        with post.image.open('rb') as stored:
+            self.assertEqual(stored.read(), image.file.getvalue())
+
+    def test_exif_is_stripped(self):
+        '''EXIF удаляется, а поворот применяется к картинке.'''
+        exif = Image.Exif()
+        exif[ORIENTATION] = ROTATED
+        self.upload(image_file(
+            image_format='JPEG', name='photo.jpg', exif=exif.tobytes()))
+        post = Post.objects.get(text=POST_TEXT)
+        with post.image.open('rb') as stored, Image.open(stored) as image:
+            self.assertNotIn('exif', image.info)
+            self.assertEqual(image.size, (20, 40))
+
+    def test_csrf_is_checked(self):
+        '''Загрузка без CSRF-токена отклоняется.'''
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        self.assertTemplateUsed(
+            self.upload(image_file(), client), 'core/403csrf.html')
@@ -1,6 +1,7 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 
+from core.testing import QueryBudgetMixin
 from posts.models import Group, Post, User
 
 GROUP_TITLE = 'Тестовая группа'
@@ -21,7 +22,7 @@ PROFILE_FOLLOW = reverse('posts:profile_follow', args=[USERNAME])
 PROFILE_UNFOLLOW = reverse('posts:profile_unfollow', args=[USERNAME])
 
 
-class PostURLTests(TestCase):
+class PostURLTests(QueryBudgetMixin, TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -7,13 +7,16 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from posts.models import Group, Follow, Post, User
-from posts.settings import POST_PER_PAGE
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Group, Follow, Post, User
+from posts.settings import COMMENTS_PER_PAGE, POST_PER_PAGE
 
 GROUP_TITLE = "Тестовая группа"
 GROUP_SLUG = "test-slug"
 GROUP_DESCRIPTION = "Тестовое описание"
 POST_TEXT = "Тестовый текст поста"
+NEW_POST_TEXT = "Изменённый текст поста"
+NEW_GROUP_TITLE = "Переименованная группа"
 GROUP_SLUG_WITHOUT_POST = "test-slug-without-post"
 GROUP_TITLE_WITHOUT_POST = "Тестовая группа без поста"
 USERNAME = "user"
@@ -46,7 +49,7 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
-class PostViewsTests(TestCase):
+class PostViewsTests(QueryBudgetMixin, TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -158,14 +161,45 @@ class PostViewsTests(TestCase):
 
     def test_index_cache(self):
         '''Проверка кэша на странице index.'''
+        cache.clear()
         response1 = self.authorized_client.get(INDEX)
-        Post.objects.all().delete()
+        Post.objects.update(text=NEW_POST_TEXT)
         response2 = self.authorized_client.get(INDEX)
         self.assertEqual(response1.content, response2.content)
         cache.clear()
         response3 = self.authorized_client.get(INDEX)
         self.assertNotEqual(response2.content, response3.content)
 
+    def test_feed_cache_invalidation(self):
+        '''Изменения постов и групп сбрасывают кэш лент.'''
+        pages = [INDEX, GROUP_LIST, PROFILE]
+        for page in pages:
+            self.authorized_client.get(page)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = NEW_POST_TEXT
+        post.save()
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(
+                    self.authorized_client.get(page), NEW_POST_TEXT)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = NEW_GROUP_TITLE
+        group.save()
+        self.assertContains(self.authorized_client.get(INDEX), NEW_GROUP_TITLE)
+
+    def test_feed_cache_depends_on_page(self):
+        '''Вторая страница не берётся из кэша первой.'''
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'{POST_TEXT} {i}')
+            for i in range(POST_PER_PAGE)
+        )
+        cache.clear()
+        first = self.authorized_client.get(INDEX)
+        second = self.authorized_client.get(
+            INDEX, {'cursor': first.context['page_obj'].paginator.next_cursor})
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, self.post.text)
+
     def test_following(self):
         '''Проверка подписки на автора.'''
         followes_count = Follow.objects.count()
@@ -183,3 +217,215 @@ class PostViewsTests(TestCase):
         self.follower_client.get(self.UNFOLLOW)
         self.assertEqual(followes_count - 1, Follow.objects.count())
         self.assertFalse(self.follower_user.follower.filter(author=self.user))
+
+
+class CommentsPaginationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_PER_PAGE + 1)
+        )
+        cls.comments = list(cls.post.comments.all())
+        cls.POST_DETAIL = reverse("posts:post_detail", args=[cls.post.pk])
+        cls.COMMENTS = reverse("posts:comments", args=[cls.post.pk])
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_paginated(self):
+        """Комментарии выводятся страницами в выбранном порядке."""
+        orders = {
+            'oldest': self.comments,
+            'newest': self.comments[::-1],
+        }
+        for order, expected in orders.items():
+            with self.subTest(order=order):
+                page = self.guest.get(
+                    self.POST_DETAIL, {'order': order}
+                ).context['comments_page']
+                self.assertEqual(list(page), expected[:COMMENTS_PER_PAGE])
+                self.assertTrue(page.has_next())
+
+    def test_comments_pages_links(self):
+        """Страницы комментариев связаны ссылками «Предыдущие/Следующие»."""
+        response = self.guest.get(self.POST_DETAIL)
+        cursor = response.context['comments_page'].paginator.next_cursor
+        self.assertContains(
+            response, f'{self.POST_DETAIL}?order=oldest&cursor={cursor}')
+        self.assertNotContains(response, 'Предыдущие')
+        response = self.guest.get(self.POST_DETAIL, {'cursor': cursor})
+        page = response.context['comments_page']
+        self.assertEqual(list(page), self.comments[-1:])
+        self.assertContains(
+            response, f'cursor={page.paginator.previous_cursor}')
+        self.assertNotContains(response, 'Следующие')
+
+    def test_comments_fragment(self):
+        """Фрагмент отдаёт следующую порцию комментариев."""
+        page = self.guest.get(self.POST_DETAIL).context['comments_page']
+        cursor = page.paginator.next_cursor
+        response = self.guest.get(self.COMMENTS, {'cursor': cursor})
+        self.assertTemplateUsed(
+            response, 'posts/includes/comment_list.html')
+        self.assertEqual(
+            list(response.context['comments_page']), self.comments[-1:])
+        data = self.guest.get(
+            self.COMMENTS, {'cursor': cursor, 'format': 'json'}).json()
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            [self.comments[-1].pk]
+        )
+        self.assertIsNone(data['next_cursor'])
+
+    def test_comments_query_budget(self):
+        """
+        Авторы комментариев загружаются вместе с комментариями; первый
+        запрос — автор поста для ETag.
+        """
+        cache.clear()
+        with self.assertNumQueries(3):
+            self.guest.get(self.POST_DETAIL)
+
+
+class ConditionalGetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower_user = User.objects.create_user(username=FOLLOWER)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE, slug=GROUP_SLUG, description=GROUP_DESCRIPTION,
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text=POST_TEXT, group=cls.group)
+        cls.POST_DETAIL = reverse("posts:post_detail", args=[cls.post.pk])
+        cls.pages = [INDEX, GROUP_LIST, PROFILE, cls.POST_DETAIL]
+        cls.guest = Client()
+        cls.follower_client = Client()
+        cls.follower_client.force_login(cls.follower_user)
+
+    def revalidate(self, client, page, response):
+        return client.get(page, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_page_is_not_modified(self):
+        """Страница без изменений отдаётся как 304 без шаблонов."""
+        for page in self.pages:
+            with self.subTest(page=page):
+                response = self.guest.get(page)
+                self.assertEqual(response.status_code, 200)
+                with self.assertTemplateNotUsed("posts/includes/post.html"):
+                    again = self.revalidate(self.guest, page, response)
+                self.assertEqual(again.status_code, 304)
+                self.assertEqual(again["ETag"], response["ETag"])
+
+    def test_post_changes_update_etag(self):
+        """Правка поста меняет ETag всех страниц, где он выводится."""
+        responses = {page: self.guest.get(page) for page in self.pages}
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = NEW_POST_TEXT
+        post.save()
+        for page, response in responses.items():
+            with self.subTest(page=page):
+                self.assertContains(
+                    self.revalidate(self.guest, page, response),
+                    NEW_POST_TEXT)
+
+    def test_comment_updates_post_etag(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        response = self.guest.get(self.POST_DETAIL)
+        Comment.objects.create(
+            post=self.post, author=self.follower_user, text=POST_TEXT)
+        self.assertEqual(
+            self.revalidate(self.guest, self.POST_DETAIL, response)
+            .status_code, 200)
+
+    def test_follow_updates_profile_etag(self):
+        """Подписка меняет ETag профиля автора для подписчика."""
+        response = self.follower_client.get(PROFILE)
+        Follow.objects.create(user=self.follower_user, author=self.user)
+        self.assertEqual(
+            self.revalidate(self.follower_client, PROFILE, response)
+            .status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """ETag гостя не подходит авторизованному пользователю."""
+        for page in self.pages:
+            with self.subTest(page=page):
+                response = self.guest.get(page)
+                self.assertEqual(
+                    self.revalidate(self.follower_client, page, response)
+                    .status_code, 200)
+
+    def test_missing_objects(self):
+        """Страницы несуществующих объектов отвечают 404."""
+        missing = [
+            reverse("posts:group_list", args=[GROUP_SLUG_WITHOUT_POST]),
+            reverse("posts:profile", args=[NON_FOLLOWER]),
+            reverse("posts:post_detail", args=[self.post.pk + 1]),
+        ]
+        for page in missing:
+            with self.subTest(page=page):
+                self.assertEqual(self.guest.get(page).status_code, 404)
+
+
+class AnonymousPageCacheTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE, slug=GROUP_SLUG, description=GROUP_DESCRIPTION,
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text=POST_TEXT, group=cls.group)
+        cls.POST_DETAIL = reverse("posts:post_detail", args=[cls.post.pk])
+        cls.pages = [INDEX, GROUP_LIST, PROFILE, cls.POST_DETAIL]
+        cls.guest = Client()
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_guest_gets_cached_page(self):
+        """Повторный запрос гостя не рендерит шаблоны."""
+        for page in self.pages:
+            with self.subTest(page=page):
+                first = self.guest.get(page)
+                with self.assertTemplateNotUsed("base.html"):
+                    second = self.guest.get(page)
+                self.assertEqual(second.content, first.content)
+        with self.assertNumQueries(0):
+            self.guest.get(INDEX)
+
+    def test_authorized_user_bypasses_cache(self):
+        """Авторизованный пользователь получает страницу без кэша."""
+        for page in self.pages:
+            with self.subTest(page=page):
+                self.authorized_client.get(page)
+                with self.assertTemplateUsed("base.html"):
+                    self.authorized_client.get(page)
+
+    def test_signals_invalidate_pages(self):
+        """Правки постов, комментариев и групп сбрасывают страницы."""
+        for page in self.pages:
+            self.guest.get(page)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = NEW_POST_TEXT
+        post.save()
+        for page in self.pages:
+            with self.subTest(page=page):
+                self.assertContains(self.guest.get(page), NEW_POST_TEXT)
+        Comment.objects.create(
+            post=self.post, author=self.user, text=POST_TEXT)
+        self.assertContains(self.guest.get(self.POST_DETAIL), POST_TEXT)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = NEW_GROUP_TITLE
+        group.save()
+        self.assertContains(self.guest.get(GROUP_LIST), NEW_GROUP_TITLE)
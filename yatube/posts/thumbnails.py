@@ -0,0 +1,187 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import caching
+from .settings import (
+    THUMBNAIL_GEOMETRIES, THUMBNAIL_RETRY_DELAY, THUMBNAIL_WORKERS
+)
+
+MIME_TYPES = {
+    "AVIF": "image/avif",
+    "WEBP": "image/webp",
+    "JPEG": "image/jpeg",
+}
+
+# Версия sorl-thumbnail, с приватным API которой сверен sorl_name.
+SORL_VERSION = "12.7.0"
+QUEUED_KEY = "thumbnail-queued:{}"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def sorl_name(source, geometry, options):
+    """
+    Имя файла миниатюры, которое выберет ``get_thumbnail``. Единственное
+    место, где используется приватный API ThumbnailBackend
+    (``_get_format``, ``_get_thumbnail_filename``): при обновлении sorl
+    сверить его и SORL_VERSION.
+    """
+    backend = default.backend
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+@lru_cache(maxsize=None)
+def supported(image_format):
+    """Умеют ли sorl и эта сборка Pillow сохранять формат."""
+    Image.init()
+    return image_format in EXTENSIONS and image_format in Image.SAVE
+
+
+def variants():
+    """Ключи (ширина, формат) миниатюр, которые можно приготовить."""
+    return [
+        variant for variant in THUMBNAIL_GEOMETRIES if supported(variant[1])
+    ]
+
+
+def _thumbnail_file(name, variant):
+    geometry, options = THUMBNAIL_GEOMETRIES[variant]
+    return ImageFile(
+        sorl_name(ImageFile(name), geometry, options), default.storage)
+
+
+def cached(name, variant):
+    """
+    Готовая миниатюра из хранилища ключей sorl или None. В отличие от
+    тега ``{% thumbnail %}`` никогда не открывает и не сжимает картинку.
+    """
+    return default.kvstore.get(_thumbnail_file(name, variant))
+
+
+def ready_many(names):
+    """
+    Готовые миниатюры картинок ``names`` одним запросом к хранилищу
+    ключей: {имя: ({формат: [(ширина, миниатюра), ...]}, чего-то нет)}.
+    """
+    files = {
+        (name, variant): _thumbnail_file(name, variant)
+        for name in names
+        for variant in variants()
+    }
+    found = default.kvstore.get_many(files.values())
+    result = {}
+    for name in names:
+        ready, missing = {}, False
+        for width, image_format in variants():
+            thumbnail = found.get(files[name, (width, image_format)].key)
+            if thumbnail is None:
+                missing = True
+            else:
+                ready.setdefault(image_format, []).append((width, thumbnail))
+        result[name] = ready, missing
+    return result
+
+
+def ready(name):
+    """Готовые миниатюры одной картинки, как в ``ready_many``."""
+    return ready_many([name])[name]
+
+
+def prefetch(posts):
+    """
+    Разрешить миниатюры всех постов страницы разом: тег ``post_picture``
+    возьмёт их из ``post.ready_thumbnails``.
+    """
+    posts = [post for post in posts if post.image]
+    found = ready_many({post.image.name for post in posts})
+    for post in posts:
+        post.ready_thumbnails = found[post.image.name]
+    return posts
+
+
+def feed_scopes(post):
+    """Ленты и страница, на которых выводится пост."""
+    scopes = [
+        caching.index_scope(),
+        caching.profile_scope(post.author_id),
+        caching.post_scope(post.pk),
+    ]
+    if post.group_id:
+        scopes.append(caching.group_scope(post.group_id))
+    return scopes
+
+
+def generate(name, scopes=()):
+    """
+    Приготовить миниатюры всех размеров для картинки ``name`` и сбросить
+    ленты ``scopes``, где вместо картинки закэширована заглушка. После
+    ошибки отметка в очереди остаётся до конца THUMBNAIL_RETRY_DELAY.
+    """
+    try:
+        for variant in variants():
+            geometry, options = THUMBNAIL_GEOMETRIES[variant]
+            get_thumbnail(name, geometry, **options)
+        if scopes:
+            caching.bump(*scopes)
+        cache.delete(QUEUED_KEY.format(name))
+    except Exception:
+        logger.exception("Не удалось приготовить миниатюры %s", name)
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                THUMBNAIL_WORKERS, thread_name_prefix="thumbnails")
+        return _executor
+
+
+def submit(name, scopes=()):
+    """
+    Поставить картинку в очередь, если её там нет. Отметка в общем кэше
+    живёт THUMBNAIL_RETRY_DELAY: картинку, которая готовится или не
+    приготовилась, страницы не ставят в очередь снова.
+    """
+    if not cache.add(QUEUED_KEY.format(name), True, THUMBNAIL_RETRY_DELAY):
+        return
+    if THUMBNAIL_WORKERS:
+        get_executor().submit(generate, name, scopes)
+    else:
+        generate(name, scopes)
+
+
+def enqueue(post):
+    """
+    Поставить картинку поста в очередь после фиксации транзакции: поток
+    пула должен увидеть сохранённый файл и пост.
+    """
+    if post.image:
+        name, scopes = post.image.name, feed_scopes(post)
+        transaction.on_commit(lambda: submit(name, scopes))
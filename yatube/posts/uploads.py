@@ -0,0 +1,161 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import (
+    SkipFile, TemporaryFileUploadHandler
+)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+from .settings import (
+    IMAGE_HEADER_BYTES, IMAGE_JPEG_QUALITY, IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS,
+    IMAGE_MAX_SIDE, IMAGE_SANITIZE_WORKERS
+)
+
+TOO_LARGE = "Файл больше {limit}"
+TOO_MANY_PIXELS = "Картинка больше {width}×{height} или {pixels} Мпикс"
+# Метаданные, ради которых картинка пересохраняется.
+METADATA = ("exif", "xmp", "XML:com.adobe.xmp", "comment")
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _too_large(width, height):
+    return (
+        max(width, height) > IMAGE_MAX_SIDE
+        or width * height > IMAGE_MAX_PIXELS
+    )
+
+
+def _too_many_pixels():
+    return TOO_MANY_PIXELS.format(
+        width=IMAGE_MAX_SIDE, height=IMAGE_MAX_SIDE,
+        pixels=IMAGE_MAX_PIXELS // 10 ** 6)
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет файлы сразу на диск и обрывает приём, как только файл
+    превысил лимит байт или заголовок картинки объявил слишком большие
+    размеры: пиксели при этом не раскодируются. Причины отказа
+    складываются в ``request.upload_errors`` для формы.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        request.upload_errors = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b""
+        self.checked = False
+
+    def reject(self, message):
+        self.request.upload_errors[self.field_name] = message
+        raise SkipFile
+
+    def check_header(self):
+        try:
+            with Image.open(BytesIO(self.header)) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            width = height = IMAGE_MAX_SIDE + 1
+        except (OSError, SyntaxError, ValueError):
+            # Заголовок ещё не пришёл целиком или это не картинка: второе
+            # выяснит валидация формы, а размеры ещё раз проверит
+            # sanitize до раскодирования.
+            if len(self.header) < IMAGE_HEADER_BYTES:
+                return
+            width = height = 0
+        self.checked = True
+        self.header = b""
+        if _too_large(width, height):
+            self.reject(_too_many_pixels())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > IMAGE_MAX_BYTES:
+            self.reject(TOO_LARGE.format(
+                limit=filesizeformat(IMAGE_MAX_BYTES)))
+        if not self.checked:
+            self.header += raw_data[:IMAGE_HEADER_BYTES - len(self.header)]
+            self.check_header()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def image_uploads(view):
+    """
+    Принимать файлы вида через ``ImageUploadHandler``. Обработчики
+    нужно заменить до чтения тела запроса, а его читает проверка CSRF,
+    поэтому она переносится внутрь декоратора.
+    """
+    protected = csrf_protect(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+
+    return csrf_exempt(wrapper)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                IMAGE_SANITIZE_WORKERS, thread_name_prefix="uploads")
+        return _executor
+
+
+def _sanitize(upload):
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except Image.DecompressionBombError:
+        raise ValidationError(_too_many_pixels())
+    with image:
+        # Image.open читает только заголовок, так что размеры известны
+        # до раскодирования — даже если обработчик загрузки их не нашёл.
+        if _too_large(*image.size):
+            raise ValidationError(_too_many_pixels())
+        if not any(key in image.info for key in METADATA):
+            return upload
+        image_format = image.format
+        params = {}
+        if image.info.get("icc_profile"):
+            params["icc_profile"] = image.info["icc_profile"]
+        if getattr(image, "is_animated", False):
+            params["save_all"] = True
+        else:
+            image = ImageOps.exif_transpose(image)
+        for key in METADATA:
+            image.info.pop(key, None)
+        if image_format == "JPEG":
+            params["quality"] = IMAGE_JPEG_QUALITY
+        clean = TemporaryUploadedFile(
+            upload.name, upload.content_type, 0, upload.charset)
+        image.save(clean, image_format, **params)
+    clean.size = clean.tell()
+    clean.seek(0)
+    return clean
+
+
+def sanitize(upload):
+    """
+    Загруженная картинка без EXIF и прочих метаданных, с учётом поворота
+    из EXIF. Картинка больше IMAGE_MAX_SIDE/IMAGE_MAX_PIXELS отвергается
+    ``ValidationError`` до раскодирования. Чистые картинки возвращаются
+    как есть. Имя файла в хранилище — хеш содержимого, поэтому чистка
+    идёт до сохранения, в пуле с ограниченным числом потоков.
+    """
+    if IMAGE_SANITIZE_WORKERS:
+        return get_executor().submit(_sanitize, upload).result()
+    return _sanitize(upload)
@@ -1,56 +1,184 @@
 from django.shortcuts import get_object_or_404, render
-from django.core.paginator import Paginator
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlencode
 
+from . import caching, search, thumbnails
+from .feeds import follow_feed, follow_paginator
 from .forms import PostForm, CommentForm
 from .models import Post, Group, User, Follow
-from .settings import POST_PER_PAGE
+from .paginator import CursorPaginator
+from .settings import (
+    COMMENT_ORDERINGS, COMMENTS_PER_PAGE, FEED_CACHE_TIMEOUT, POST_PER_PAGE,
+    SEARCH_MAX_QUERY_LENGTH
+)
+from .uploads import image_uploads
+
+
+def get_page(paginator, request):
+    page = paginator.get_page(
+        request.GET.get("page"), cursor=request.GET.get("cursor")
+    )
+    thumbnails.prefetch(page)
+    return page
 
 
 def paginator_obj(obj, obj_per_page, request):
-    return Paginator(obj, obj_per_page).get_page(request.GET.get("page"))
+    return get_page(CursorPaginator(obj, obj_per_page), request)
+
+
+def cached_feed_context(request, posts, scope):
+    """
+    Контекст ленты под кэш фрагмента: страница строится лениво,
+    только если фрагмента с текущей версией ленты нет в кэше.
+    """
+    return {
+        "page_obj": SimpleLazyObject(
+            lambda: paginator_obj(posts, POST_PER_PAGE, request)),
+        "feed_cache_key": caching.feed_key(request, scope),
+        "feed_cache_timeout": FEED_CACHE_TIMEOUT,
+    }
+
+
+def index_scopes(request):
+    return [caching.index_scope()]
+
 
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        "pk", flat=True).first()
+    if group_id is not None:
+        return [caching.group_scope(group_id)]
 
+
+def profile_scopes(request, username):
+    user_id = User.objects.filter(username=username).values_list(
+        "pk", flat=True).first()
+    if user_id is not None:
+        return [caching.profile_scope(user_id), caching.stats_scope(user_id)]
+
+
+def post_scopes(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).order_by().values_list(
+        "author_id", flat=True).first()
+    if author_id is not None:
+        return [caching.post_scope(post_id), caching.stats_scope(author_id)]
+
+
+@caching.page(index_scopes)
 def index(request):
-    return render(request, "posts/index.html", {
-        "page_obj": paginator_obj(Post.objects.all(), POST_PER_PAGE, request)
-    })
+    return render(request, "posts/index.html", cached_feed_context(
+        request, Post.objects.feed(), caching.index_scope()
+    ))
 
 
+@caching.page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     return render(request, "posts/group_list.html", {
         "group": group,
-        "page_obj": paginator_obj(group.posts.all(), POST_PER_PAGE, request),
+        **cached_feed_context(
+            request, group.posts.feed(), caching.group_scope(group.pk)),
     })
 
 
+@caching.page(profile_scopes)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
+    user = get_object_or_404(
+        User.objects.select_related("stats"), username=username)
     following = request.user.is_authenticated and (
-        set(user.following.all()) | set(request.user.follower.all())
+        Follow.objects.is_following(request.user, user)
     )
     context = {
-        "page_obj": paginator_obj(user.posts.all(), POST_PER_PAGE, request),
         "author": user,
-        "following": following
+        "following": following,
+        **cached_feed_context(
+            request, user.posts.feed(), caching.profile_scope(user.pk)),
     }
     return render(request, "posts/profile.html", context)
 
 
+def search_posts(request):
+    query = request.GET.get("q", "").strip()[:SEARCH_MAX_QUERY_LENGTH]
+    page_obj = None
+    if query:
+        page_obj = CursorPaginator(
+            search.search(Post.objects.feed(), query),
+            POST_PER_PAGE,
+            ordering=search.ORDERING,
+        ).get_page(cursor=request.GET.get("cursor"))
+        for post in page_obj:
+            post.snippet = search.highlight(post.text, query)
+        thumbnails.prefetch(page_obj)
+    return render(request, "posts/search.html", {
+        "query": query,
+        "page_obj": page_obj,
+        "paginator_query": urlencode({"q": query}),
+    })
+
+
+def comments_obj(post, request):
+    """Страница комментариев поста в порядке из ``?order=``."""
+    order = request.GET.get("order")
+    if order not in COMMENT_ORDERINGS:
+        order = next(iter(COMMENT_ORDERINGS))
+    page = CursorPaginator(
+        post.comments.select_related("author").only(
+            "text", "created", "post", "author", "author__username"),
+        COMMENTS_PER_PAGE,
+        ordering=COMMENT_ORDERINGS[order],
+    ).get_page(cursor=request.GET.get("cursor"))
+    return page, order
+
+
+@caching.page(post_scopes)
 def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), pk=post_id
+    )
+    comments_page, order = comments_obj(post, request)
     return render(request, "posts/post_detail.html", {
-        "post": get_object_or_404(Post, pk=post_id),
+        "post": post,
+        "comments_page": comments_page,
+        "comments_order": order,
         "form": CommentForm(request.POST or None)
     })
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    comments_page, order = comments_obj(post, request)
+    if request.GET.get("format") != "json":
+        return render(request, "posts/includes/comment_list.html", {
+            "post": post,
+            "comments_page": comments_page,
+            "comments_order": order,
+        })
+    return JsonResponse({
+        "order": order,
+        "next_cursor": comments_page.paginator.next_cursor,
+        "comments": [
+            {
+                "id": comment.pk,
+                "author": comment.author.username,
+                "text": comment.text,
+                "created": comment.created,
+            }
+            for comment in comments_page
+        ],
+    })
+
+
 @login_required
+@image_uploads
 def create_post(request):
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None
+        files=request.FILES or None,
+        upload_errors=request.upload_errors
     )
     if not form.is_valid():
         return render(request, "posts/create_post.html", {"form": form})
@@ -61,6 +189,7 @@ def create_post(request):
 
 
 @login_required
+@image_uploads
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -68,7 +197,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        upload_errors=request.upload_errors
     )
     if not form.is_valid():
         return render(request, "posts/create_post.html", {
@@ -94,21 +224,19 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
     return render(request, 'posts/follow.html', {
-        'page_obj': paginator_obj(posts, POST_PER_PAGE, request)
+        'page_obj': get_page(follow_paginator(
+            [posts.feed() for posts in follow_feed(request.user)],
+            POST_PER_PAGE
+        ), request)
     })
 
 
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if (request.user.username != username
-            and not request.user.follower.filter(author=author).exists()):
-        Follow.objects.create(
-            user=request.user,
-            author=author
-        )
+    if author != request.user:
+        Follow.objects.follow(request.user, author)
     return redirect('posts:profile', username)
 
 
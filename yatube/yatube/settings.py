@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -38,10 +39,13 @@ INSTALLED_APPS = [
     "users.apps.UsersConfig",
     "core.apps.CoreConfig",
     "about.apps.AboutConfig",
+    "api.apps.ApiConfig",
     "sorl.thumbnail",
 ]
 
 MIDDLEWARE = [
+    "core.middleware.InstrumentationMiddleware",
+    "core.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -58,7 +62,7 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.template_backends.TimedDjangoTemplates",
         "DIRS": [TEMPLATES_DIR],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -79,13 +83,39 @@ WSGI_APPLICATION = "yatube.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединение живёт DATABASE_CONN_MAX_AGE секунд и переиспользуется
+# запросами того же потока (0 — новое соединение на каждый запрос).
+# Перед запросом открытое соединение проверяется, если включено
+# DATABASE_HEALTH_CHECKS. Бэкенды core.backends.sqlite3 и
+# core.backends.postgresql считают соединения для /core/metrics/.
+DATABASE_CONN_MAX_AGE = int(os.environ.get("DATABASE_CONN_MAX_AGE", 60))
+DATABASE_HEALTH_CHECKS = os.environ.get("DATABASE_HEALTH_CHECKS", "1") == "1"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "core.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
     }
 }
 
+# Реплики только для чтения: DATABASE_REPLICAS=2 в окружении добавит
+# replica1 и replica2 в файлах db.replicaN.sqlite3. Их обновляет
+# manage.py sync_replicas; в тестах реплики смотрят в основную базу.
+# Отставание реплик не должно превышать REPLICA_MAX_LAG из
+# core/settings.py: дольше этого страницы из кэша могут быть старыми.
+DATABASE_REPLICAS = [
+    f"replica{number}"
+    for number in range(1, int(os.environ.get("DATABASE_REPLICAS", 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME": os.path.join(BASE_DIR, f"db.{alias}.sqlite3"),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -140,8 +170,50 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Идёт ли прогон тестов (manage.py test или pytest).
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# Общий для всех процессов кэш: версии лент, фрагменты, записи sorl и
+# отметки очереди миниатюр должны быть видны всем воркерам. По умолчанию
+# это файлы в BASE_DIR/cache, для продакшена окружением задаётся Redis
+# или memcached. Тесты держат его в памяти процесса.
+SHARED_CACHE_BACKEND = os.environ.get(
+    'SHARED_CACHE_BACKEND',
+    'django.core.cache.backends.locmem.LocMemCache' if TESTING
+    else 'django.core.cache.backends.filebased.FileBasedCache')
+SHARED_CACHE_LOCATION = os.environ.get(
+    'SHARED_CACHE_LOCATION',
+    'shared' if TESTING else os.path.join(BASE_DIR, 'cache'))
+# На картинку приходится 11 записей sorl: исходник, 9 миниатюр и их
+# список. Лимит рассчитан на ~5000 картинок вместе со страницами лент.
+SHARED_CACHE_MAX_ENTRIES = int(
+    os.environ.get('SHARED_CACHE_MAX_ENTRIES', 100000))
+
+# Записи sorl-thumbnail живут только в кэше и читаются пачками.
+# Потерянная запись восстанавливается по файлу миниатюры без нарезки.
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+THUMBNAIL_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'BACK': 'shared',
+            'FRONT_TIMEOUT': 5,
+            'FRONT_MAX_ENTRIES': 1000,
+            # Изменяемые ключи, которые процессы должны видеть сразу.
+            'SHARED_PREFIXES': ('feed-version:', 'metrics:'),
+        },
+    },
+    'shared': {
+        'BACKEND': SHARED_CACHE_BACKEND,
+        'LOCATION': SHARED_CACHE_LOCATION,
+        'TIMEOUT': THUMBNAIL_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': SHARED_CACHE_MAX_ENTRIES,
+            # При переполнении удаляется десятая часть ключей, а не треть.
+            'CULL_FREQUENCY': 10,
+        },
+    },
 }
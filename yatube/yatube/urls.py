@@ -10,6 +10,8 @@ handler403 = 'core.views.permission_denied'
 urlpatterns = [
     path("about/", include("about.urls", namespace="about")),
     path("admin/", admin.site.urls),
+    path("api/", include("api.urls", namespace="api")),
+    path("core/", include("core.urls", namespace="core")),
     path("auth/", include("users.urls", namespace="users")),
     path("auth/", include("django.contrib.auth.urls")),
     path("", include("posts.urls", namespace="posts")),